@@ -0,0 +1,153 @@
+"""
+Benchmark of Api.get_hierarchy against the local mock iSee server.
+
+For each tree size it reports assets/sec, per-stage timings (fetch, path
+resolution, ancestor extraction, merge) and the peak memory allocated by the
+client. The mock server runs in a separate process so it does not count
+towards the client's memory.
+
+    python -m benchmarks.bench_hierarchy                     # 1k .. 500k assets
+    python -m benchmarks.bench_hierarchy --sizes 1000 10000 --workers 8 --latency 0.05
+    python -m benchmarks.bench_hierarchy --output bench.json
+    python -m benchmarks.bench_hierarchy --baseline bench.json   # exit 1 on regression
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from benchmarks.mock_isee import MockConfig, MockIseeServer
+from src.api import Api
+
+DEFAULT_SIZES = (1000, 10000, 100000, 500000)
+STAGES = ("fetch", "path_resolution", "ancestor_extraction", "merge")
+
+
+def _serve(config: MockConfig, port_queue, stop_event):
+    server = MockIseeServer(config).start()
+    port_queue.put(server.httpd.server_address[1])
+    stop_event.wait()
+    server.stop()
+
+
+class ServerProcess:
+    """Runs a MockIseeServer in a child process for the duration of a `with` block."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self._port_queue = multiprocessing.Queue()
+        self._stop_event = multiprocessing.Event()
+        self._process = multiprocessing.Process(target=_serve, args=(config, self._port_queue, self._stop_event), daemon=True)
+        self.base_url = None
+
+    def __enter__(self):
+        self._process.start()
+        self.base_url = f"http://127.0.0.1:{self._port_queue.get(timeout=600)}"
+        return self
+
+    def __exit__(self, *exc):
+        self._stop_event.set()
+        self._process.join(timeout=10)
+
+
+def fetch_once(base_url: str, workers: int, measure_memory: bool = False):
+    """Logs in to the mock server and runs one get_hierarchy. Returns a result dict."""
+    api = Api("bench", "bench", base_url=base_url)
+    api.login_step1_get_dbs("EU")
+    api.login_step2_select_db("db0")
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    df_hierarchy, df_listname = api.get_hierarchy(workers=workers)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    if df_hierarchy is None:
+        raise RuntimeError("get_hierarchy failed against the mock server")
+    return {
+        "seconds": elapsed,
+        "rows": len(df_hierarchy),
+        "assets": len(df_listname),
+        "timings": dict(api.telemetry.stages),
+        "peak_bytes": peak,
+    }
+
+
+def run_benchmark(sizes, workers: int, latency: float, depth: int, measure_memory: bool = True):
+    results = []
+    for size in sizes:
+        config = MockConfig(assets=size, depth=depth, latency=latency)
+        with ServerProcess(config) as server:
+            timed = fetch_once(server.base_url, workers)
+            # A second run under tracemalloc, which would distort the timings of the first one
+            peak = fetch_once(server.base_url, workers, measure_memory=True)["peak_bytes"] if measure_memory else None
+        result = {
+            "size": size,
+            "workers": workers,
+            "latency": latency,
+            "seconds": round(timed["seconds"], 4),
+            "assets_per_sec": round(timed["assets"] / timed["seconds"], 1),
+            "peak_mb": round(peak / 1e6, 1) if peak is not None else None,
+            **{stage: round(timed["timings"].get(stage, 0.0), 4) for stage in STAGES},
+        }
+        print_row(result)
+        results.append(result)
+    return results
+
+
+def print_row(result: dict):
+    stages = "  ".join(f"{stage}={result[stage]:.3f}s" for stage in STAGES)
+    peak = f"{result['peak_mb']:.1f} MB" if result["peak_mb"] is not None else "n/a"
+    print(f"{result['size']:>8} assets  {result['seconds']:8.2f}s  {result['assets_per_sec']:>10.0f} assets/s  "
+          f"peak {peak:>10}  {stages}", flush=True)
+
+
+def compare_to_baseline(results, baseline_path: str, max_regression: float) -> list:
+    """Returns a description of every size whose throughput dropped more than max_regression."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {entry["size"]: entry for entry in json.load(f)}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["size"])
+        if previous is None:
+            continue
+        ratio = result["assets_per_sec"] / previous["assets_per_sec"]
+        if ratio < 1 - max_regression:
+            regressions.append(
+                f"{result['size']} assets: {result['assets_per_sec']:.0f} assets/s vs {previous['assets_per_sec']:.0f} "
+                f"({(1 - ratio) * 100:.0f}% slower)"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Api.get_hierarchy against a local mock iSee server.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to every request.")
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--skip-memory", action="store_true", help="Skip the tracemalloc run (peak memory).")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Tolerated throughput drop against the baseline (0.2 = 20%%).")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.workers, args.latency, args.depth, measure_memory=not args.skip_memory)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
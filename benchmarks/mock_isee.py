@@ -0,0 +1,230 @@
+"""
+Local stand-in for the iSee API, for benchmarks and offline development.
+
+Implements the endpoints used by src/api.py:
+    POST /apiv4/login/          -> {"token": ..., "dbs": [{"name": ..., "db": ...}]}
+    GET  /apiv4/login/<db>      -> {"token": ...}
+    GET  /apiv4/assets/?p=N&count=C -> {"_meta": {"total": T}, "_embedded": [...]}
+over a synthetic asset tree, with injectable latency and errors.
+
+Run standalone:
+    python -m benchmarks.mock_isee --assets 50000 --latency 0.05 --port 8765
+then point the client at it with Api(username, password, base_url="http://127.0.0.1:8765").
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FACTORY_TYPE = 16777221
+ASSET_TYPE = 33554432
+ZONE_TYPE = 16777222
+POINT_TYPE = 1  # leaf measurement points, anything that is not a factory / asset / zone
+
+DEFAULT_TYPE_MIX = {FACTORY_TYPE: 0.02, ZONE_TYPE: 0.08, ASSET_TYPE: 0.3, POINT_TYPE: 0.6}
+
+
+@dataclass
+class MockConfig:
+    assets: int = 10000
+    depth: int = 6                 # maximum path length below the root
+    type_mix: dict = field(default_factory=lambda: dict(DEFAULT_TYPE_MIX))
+    mac_ratio: float = 0.05        # share of assets carrying optionals.mac / coordinators
+    recycle_ratio: float = 0.01    # share of assets placed under the "Recycle bin"
+    shuffle: bool = False          # list assets in random order instead of parents first
+    latency: float = 0.0           # seconds added to every request
+    jitter: float = 0.0            # random extra latency, uniform in [0, jitter]
+    latency_per_asset: float = 0.0  # extra seconds per asset returned, so large pages are slower
+    error_rate: float = 0.0        # probability of answering an assets page with a 503
+    fail_pages: tuple = ()         # pages that always fail with a 503
+    databases: tuple = ("Mock DB",)
+    seed: int = 0
+
+
+def generate_assets(config: MockConfig):
+    """
+    Builds a synthetic asset tree: a root, a recycle bin, then `assets` nodes
+    whose type follows config.type_mix. Factories sit near the top, zones and
+    assets below them, points at the leaves.
+    """
+    rnd = random.Random(config.seed)
+    types, weights = zip(*config.type_mix.items())
+
+    def make_id(index):
+        return f"{index:024x}"
+
+    root = {"_id": make_id(0), "name": "Root", "path": [], "t": 0}
+    recycle = {"_id": make_id(1), "name": "Recycle bin", "path": [], "t": 0}
+    assets = [root, recycle]
+    # Containers that can receive children, by depth
+    containers = [[(root["_id"], [root["_id"]])]]
+    for index in range(2, config.assets + 2):
+        asset_type = rnd.choices(types, weights)[0]
+        if asset_type == FACTORY_TYPE:
+            depth = 0
+        else:
+            depth = rnd.randrange(min(len(containers), config.depth))
+        parent_id, parent_path = rnd.choice(containers[depth])
+        if rnd.random() < config.recycle_ratio:
+            parent_id, parent_path = recycle["_id"], [recycle["_id"]]
+        asset = {
+            "_id": make_id(index),
+            "name": f"{type_name(asset_type)} {index % 997}",
+            "path": list(parent_path),
+            "t": asset_type,
+        }
+        if rnd.random() < config.mac_ratio:
+            mac = f"{rnd.getrandbits(48):012X}"
+            if rnd.random() < 0.5:
+                asset["optionals"] = {"mac": mac}
+            else:
+                asset["optionals"] = {"coordinators": [":".join(mac[i:i + 2] for i in range(0, 12, 2))]}
+        assets.append(asset)
+        if asset_type != POINT_TYPE and depth + 1 < config.depth:
+            while len(containers) <= depth + 1:
+                containers.append([])
+            containers[depth + 1].append((asset["_id"], parent_path + [asset["_id"]]))
+    if config.shuffle:
+        rnd.shuffle(assets)
+    return assets
+
+
+def type_name(asset_type):
+    return {FACTORY_TYPE: "Factory", ASSET_TYPE: "Asset", ZONE_TYPE: "Zone"}.get(asset_type, "Point")
+
+
+class MockIseeServer:
+    """
+    Threaded HTTP server serving a generated tree. Usable as a context manager:
+
+        with MockIseeServer(MockConfig(assets=1000)) as server:
+            api = Api("user", "pass", base_url=server.base_url)
+    """
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.assets = generate_assets(self.config)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed + 1)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay_and_fail(self, page=None, count: int = 0) -> bool:
+        """Applies the configured latency; returns True when this request must fail."""
+        config = self.config
+        with self._lock:
+            self.requests += 1
+            extra = self._random.uniform(0, config.jitter) if config.jitter else 0.0
+            extra += config.latency_per_asset * count
+            fail = page is not None and (page in config.fail_pages or self._random.random() < config.error_rate)
+        if config.latency or extra:
+            time.sleep(config.latency + extra)
+        return fail
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                headers = {"Content-Type": "application/json"}
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=1)
+                    headers["Content-Encoding"] = "gzip"
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _token(self):
+                return self.headers.get("Authorization", "").replace("Bearer ", "")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                server._delay_and_fail()
+                if urlparse(self.path).path.rstrip("/") != "/apiv4/login":
+                    return self._send_json(404, {"error": "not found"})
+                dbs = [{"name": name, "db": f"db{index}"} for index, name in enumerate(server.config.databases)]
+                self._send_json(200, {"token": "user-token", "dbs": dbs})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split("/") if part]
+                if parts[:2] == ["apiv4", "login"] and len(parts) == 3:
+                    server._delay_and_fail()
+                    if self._token() != "user-token" and not self._token().startswith("db-token-"):
+                        return self._send_json(401, {"error": "unauthorized"})
+                    return self._send_json(200, {"token": f"db-token-{parts[2]}"})
+                if parts[:2] == ["apiv4", "assets"]:
+                    query = parse_qs(url.query)
+                    page = int(query.get("p", ["1"])[0])
+                    count = int(query.get("count", ["25"])[0])
+                    if server._delay_and_fail(page, count):
+                        return self._send_json(503, {"error": "injected failure"})
+                    if not self._token().startswith("db-token-"):
+                        return self._send_json(401, {"error": "unauthorized"})
+                    chunk = server.assets[(page - 1) * count:page * count]
+                    return self._send_json(200, {"_meta": {"total": len(server.assets)}, "_embedded": chunk})
+                self._send_json(404, {"error": "not found"})
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic iSee asset tree.")
+    parser.add_argument("--assets", type=int, default=10000)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--latency-per-asset", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--shuffle", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+    config = MockConfig(assets=args.assets, depth=args.depth, latency=args.latency, jitter=args.jitter,
+                        latency_per_asset=args.latency_per_asset, error_rate=args.error_rate, shuffle=args.shuffle)
+    server = MockIseeServer(config, port=args.port)
+    print(f"Serving {len(server.assets)} assets on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,21 @@ import streamlit as st
 import pandas as pd
 import io
 import json
+import datetime
 import os
+import uuid
+from functools import partial
+from src.asset_gateways import AssetGateways
 from src.auth import secure_page
+from src.commands import MACROS, build_commands, fleet_script_bytes, script_bytes
+from src.executor import (
+    DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, MAX_CONCURRENCY, BatchRun, LocalRunner, SshRunner, StubRunner,
+)
+from src.jobs import get_job_manager
+from src.lwsalt import PARSERS, parse_results
+from src.result_store import ResultStore, low_rssi, version_distribution
+from src.lookup import LOOKUP_COLUMNS, LookupTable, read_lookup_csv
+from src.lookup_store import LookupStore
 
 
 # --- Lookup Table for Gateway SN to MAC Address ---
@@ -21,6 +34,24 @@ TEST001,00:00:11:22:33:44
 # Default file path for lookup table (modify this path as needed)
 # You can use an absolute path like: "C:/Users/your_user/Desktop/streamlit_app/gateway_lookup.csv"
 DEFAULT_LOOKUP_FILE = "data/gateway_lookup.csv"
+# Shared lookup store (SQLite), seeded from DEFAULT_LOOKUP_FILE on first use
+DEFAULT_LOOKUP_STORE = "data/gateway_lookup.db"
+# Missing gateways for which nearest matches are searched (the rest are only listed)
+MAX_SUGGESTED = 500
+# Commands shown per preview page
+PREVIEW_PAGE_SIZE = 200
+# How the commands can be executed from the page
+RUNNER_OPTIONS = ["Dry run (nothing is executed)", "Local shell", "SSH"]
+# "Local shell" runs commands on the app server itself: only offered when this environment
+# variable is set to 1/true/yes, or the allow_local_shell secret is true
+ALLOW_LOCAL_SHELL_ENV = "BATCH_ALLOW_LOCAL_SHELL"
+# "SSH" only reaches the hosts listed in this environment variable (comma separated) or in the
+# ssh_hosts secret: it is not offered when no host is configured
+SSH_HOSTS_ENV = "BATCH_SSH_HOSTS"
+# Runners whose results are stored in the fleet results (dry runs only echo the commands)
+STORED_RUNNERS = ("local", "ssh")
+# Days of stored results queried by default in the Fleet Results tab
+DEFAULT_RESULTS_DAYS = 30
 
 # --- Helper Functions ---
 def add_to_history(command_text):
@@ -39,92 +70,378 @@ def parse_gateway_list(text_input):
     gateways = [line.strip() for line in lines if line.strip()]
     return gateways
 
+@st.cache_resource
+def open_lookup_store():
+    return LookupStore(DEFAULT_LOOKUP_STORE)
+
+def get_lookup_store():
+    """
+    The lookup store shared by every session. DEFAULT_LOOKUP_FILE is synced (upserted)
+    once per session, and again when its modification time differs from the one last seen.
+    """
+    store = open_lookup_store()
+    try:
+        mtime = os.stat(DEFAULT_LOOKUP_FILE).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if st.session_state.get('lookup_csv_mtime', -1) != mtime:
+        store.sync_csv(DEFAULT_LOOKUP_FILE)
+        st.session_state.lookup_csv_mtime = mtime
+    return store
+
 def load_lookup_from_file(file_path):
-    """Load lookup table from a CSV file"""
+    """Replace the lookup store with a CSV file (explicit reload). Returns the number of rows written, or None"""
     try:
         if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                csv_data = f.read()
-            return parse_lookup_csv(csv_data)
+            return get_lookup_store().import_csv(file_path, replace=True)
         else:
             # Don't show info message during initialization, only when explicitly requested
-            return {}
+            return None
     except Exception as e:
         st.error(f"Error while loading file {file_path}: {str(e)}")
-        return {}
+        return None
 
 def parse_lookup_csv(csv_data):
-    """Parse CSV data into a dictionary mapping serial numbers to MAC addresses (lowercase)"""
+    """Parse CSV data into a read-only table mapping serial numbers to MAC addresses (lowercase, no separators)"""
     try:
-        df = pd.read_csv(io.StringIO(csv_data))
-        # Ensure required columns exist
-        if 'serial_number' not in df.columns or 'mac_address' not in df.columns:
-            st.error("The CSV file must contain the columns 'serial_number' and 'mac_address'")
-            return {}
-        
-        # Convert DataFrame to dictionary with lowercase MAC addresses
-        lookup_dict = {}
-        for _, row in df.iterrows():
-            serial = str(row['serial_number']).strip()
-            mac = str(row['mac_address']).strip().lower()  # Convert to lowercase
-            lookup_dict[serial] = mac
-        
-        return lookup_dict
+        return read_lookup_csv(io.StringIO(csv_data))
+    except ValueError as e:
+        st.error(str(e))
     except Exception as e:
         st.error(f"Error while parsing the CSV: {str(e)}")
-        return {}
+    return LookupTable.from_frame(pd.DataFrame(columns=list(LOOKUP_COLUMNS)))
 
 def generate_commands(gateways, lookup_table, command_template):
-    """Generate commands for each gateway"""
-    commands = []
-    missing_gateways = []
+    """
+    Generate commands for each gateway (entries can be serial numbers, in any case, or MAC addresses).
+    Returns a DataFrame (serial, mac, match, command) and the list of missing gateways.
+    """
+    # Resolved and expanded over the whole list at once (MACs are already normalised by the lookup table)
+    resolved = lookup_table.index().resolve(gateways)
+    return build_commands(resolved, command_template)
+
+def render_command_preview(commands):
+    """One page of the generated commands, as text and as a table"""
+    pages = max(1, -(-len(commands) // PREVIEW_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Preview page (of {pages}, {PREVIEW_PAGE_SIZE} commands each)",
+                               min_value=1, max_value=pages, value=1, step=1)
+    window = commands.iloc[(page - 1) * PREVIEW_PAGE_SIZE:page * PREVIEW_PAGE_SIZE]
     
-    for gateway in gateways:
-        if gateway in lookup_table:
-            mac = lookup_table[gateway]  # MAC is already in lowercase from parse_lookup_csv
-            # Replace placeholders in command template
-            cmd = command_template.replace("{SERIAL}", gateway).replace("{MAC}", mac)
-            commands.append({"serial": gateway, "mac": mac, "command": cmd})
-        else:
-            missing_gateways.append(gateway)
+    # Display commands in a code block
+    st.markdown("<div class='multi-command-display'><strong>Commands to execute:</strong></div>", unsafe_allow_html=True)
+    st.code("\n".join(window["command"].tolist()), language="bash")
+    
+    # Display in table format for reference
+    with st.expander("See details for each gateway"):
+        st.dataframe(
+            window.rename(columns={"serial": "Serial Number", "mac": "MAC Address",
+                                   "match": "Matched by", "command": "Command"}),
+            hide_index=True,
+        )
+
+def suggestions_table(missing, lookup_table):
+    """Nearest serial numbers / MAC addresses of missing gateways, as a DataFrame"""
+    suggestions = lookup_table.index().suggest_many(missing[:MAX_SUGGESTED])
+    return pd.DataFrame({
+        "Entry": list(suggestions),
+        "Did you mean": [
+            ", ".join(f"{serial} ({mac})" for serial, mac, _ in found) or "-"
+            for found in suggestions.values()
+        ],
+    })
+
+def render_script_download(commands):
+    """Download of the commands as a plain list (.bat) or as a parallel bash script (.sh)"""
+    script_format = st.radio(
+        "Download format:",
+        [".bat file (one command per line)", "Bash fleet script (parallel, with timeouts)"],
+        horizontal=True
+    )
+    if script_format.startswith(".bat"):
+        st.download_button(
+            label="Download as .bat file",
+            # Written chunk by chunk, only when clicked
+            data=partial(script_bytes, commands["command"]),
+            file_name="gateway_commands.bat",
+            mime="text/plain"
+        )
+        return
+    
+    col1, col2 = st.columns(2)
+    concurrency = col1.slider("Gateways at the same time", 1, MAX_CONCURRENCY, DEFAULT_CONCURRENCY,
+                              key="script_concurrency")
+    timeout = col2.number_input("Timeout per gateway (seconds)", min_value=1, value=int(DEFAULT_TIMEOUT),
+                                step=10, key="script_timeout")
+    st.caption("Run it with `bash gateway_commands.sh` on the bastion host: each gateway's output is written "
+               "to `<mac>.log` and its status to `summary.tsv` in the output directory.")
+    st.download_button(
+        label="Download as bash script",
+        data=partial(fleet_script_bytes, commands, concurrency, timeout),
+        file_name="gateway_commands.sh",
+        mime="text/x-shellscript"
+    )
+
+def local_shell_allowed():
+    """Whether the Local shell runner was enabled for this deployment (off by default)"""
+    if os.environ.get(ALLOW_LOCAL_SHELL_ENV, "").strip().lower() in ("1", "true", "yes"):
+        return True
+    try:
+        return bool(st.secrets.get("allow_local_shell", False))
+    except FileNotFoundError:
+        return False
+
+def ssh_hosts():
+    """Hosts the SSH runner may connect to in this deployment (none by default)"""
+    hosts = os.environ.get(SSH_HOSTS_ENV, "")
+    if not hosts.strip():
+        try:
+            hosts = st.secrets.get("ssh_hosts", [])
+        except FileNotFoundError:
+            hosts = []
+    if isinstance(hosts, str):
+        hosts = hosts.split(",")
+    return [host.strip() for host in hosts if host and host.strip()]
+
+def runner_options():
+    allowed = {"Local shell": local_shell_allowed(), "SSH": bool(ssh_hosts())}
+    return [option for option in RUNNER_OPTIONS if allowed.get(option, True)]
+
+def build_runner(runner_kind, ssh_host="", ssh_user="", ssh_port=22):
+    """Runner for the option selected in the Execute section"""
+    if runner_kind == "Local shell" and local_shell_allowed():
+        return LocalRunner()
+    if runner_kind == "SSH" and ssh_host in ssh_hosts():
+        return SshRunner(ssh_host, user=ssh_user or None, port=int(ssh_port))
+    return StubRunner()
+
+def results_csv(batch):
+    return batch.frame().to_csv(index=False).encode("utf-8")
+
+def render_batch_results(batch):
+    """Status counts, per-gateway status table and output of a batch"""
+    counts = batch.counts()
+    cols = st.columns(5)
+    cols[0].metric("Pending", counts["pending"])
+    cols[1].metric("Running", counts["running"])
+    cols[2].metric("OK", counts["ok"])
+    cols[3].metric("Failed", counts["failed"] + counts["timeout"])
+    cols[4].metric("Cancelled", counts["cancelled"])
+    
+    frame = batch.frame()
+    st.dataframe(frame.drop(columns=["command"]), hide_index=True)
+    
+    finished = frame[frame["status"].isin(["ok", "failed", "timeout"])]
+    if len(finished):
+        serial = st.selectbox("Show output of:", finished["serial"].tolist(), key="batch_output_serial")
+        st.code(finished.loc[finished["serial"] == serial, "output"].iloc[0] or "(no output)")
+    
+    if batch.finished:
+        st.download_button(
+            label="Download results CSV",
+            data=partial(results_csv, batch),
+            file_name="gateway_command_results.csv",
+            mime="text/csv"
+        )
+        render_store_results(batch)
+
+def render_store_results(batch):
+    """Parses the outputs of a finished batch and appends the records to the result store"""
+    if batch.runner.name not in STORED_RUNNERS:
+        st.caption(f"Results of {batch.runner.name} runs are not stored in the fleet results.")
+        return
+    if st.session_state.get('batch_stored') is batch:
+        st.caption("Parsed results of this batch are stored (see the Fleet Results tab).")
+        return
+    if st.button("💾 Store parsed results"):
+        frames = parse_results(batch.frame())
+        if not frames:
+            st.info(f"No parsable output: only the lwsalt {', '.join(PARSERS)} commands are parsed.")
+            return
+        store = ResultStore()
+        for kind, frame in frames.items():
+            store.append(kind, frame)
+        st.session_state.batch_stored = batch
+        st.success("Stored " + ", ".join(f"{len(frame)} {kind} records" for kind, frame in frames.items()))
+
+def render_fleet_results():
+    """Fleet-wide queries over the stored lwsalt results"""
+    store = ResultStore()
+    kinds = store.kinds()
+    if not kinds:
+        st.info("No stored results yet: run lwsalt commands in the Gateway Input tab and store their parsed results.")
+        return
+    since = st.date_input("Results collected since:",
+                          value=datetime.date.today() - datetime.timedelta(days=DEFAULT_RESULTS_DAYS))
+    st.caption(f"Stored result types: {', '.join(kinds)}. For each gateway, its latest results are used.")
+    
+    st.subheader("Weak RSSI")
+    threshold = st.number_input("RSSI below (dBm):", value=-90.0, step=1.0)
+    weak = low_rssi(store, threshold, start=since)
+    st.write(f"{len(weak)} gateways")
+    st.dataframe(weak, hide_index=True)
+    
+    st.subheader("Version distribution")
+    versions = version_distribution(store, start=since)
+    if versions.empty:
+        st.info("No version results in this period.")
+    else:
+        component = st.selectbox("Component:", sorted(versions["component"].unique()))
+        selected = versions[versions["component"] == component]
+        st.bar_chart(selected.set_index("version")["gateways"])
+        st.dataframe(selected, hide_index=True)
+
+@st.fragment(run_every=1.0)
+def render_batch_job():
+    """Live status of this session's running batch; hands over to the full page once it finished."""
+    batch = st.session_state.batch_run
+    job = get_job_manager("batch").get(st.session_state.batch_job)
+    if job is not None and not job.finished:
+        st.progress(job.fraction, text=job.text or "Running commands...")
+        if st.button("⏹️ Cancel", disabled=batch.cancelled):
+            batch.cancel()
+        render_batch_results(batch)
+        return
     
-    return commands, missing_gateways
+    st.session_state.batch_job = None
+    st.session_state.batch_messages = list(job.messages) if job is not None else []
+    st.rerun(scope="app")
+
+def render_execution(commands):
+    """Runs the generated commands through the selected runner, in the background"""
+    running = st.session_state.get('batch_job') is not None
+    with st.expander("▶️ Execute commands", expanded=running or st.session_state.get('batch_run') is not None):
+        runner_kind = st.selectbox("Runner:", runner_options(), disabled=running)
+        ssh_host, ssh_user, ssh_port = "", "", 22
+        if runner_kind == "SSH":
+            col1, col2, col3 = st.columns([2, 1, 1])
+            ssh_host = col1.selectbox("Host", ssh_hosts(), disabled=running)
+            ssh_user = col2.text_input("User", disabled=running)
+            ssh_port = col3.number_input("Port", min_value=1, max_value=65535, value=22, disabled=running)
+            st.caption("Authentication uses the SSH keys or agent of the server running this app.")
+        elif runner_kind == "Local shell":
+            st.caption("Commands run on the server hosting this app.")
+        
+        col1, col2 = st.columns(2)
+        concurrency = col1.slider("Commands at the same time", 1, MAX_CONCURRENCY, DEFAULT_CONCURRENCY,
+                                  disabled=running)
+        timeout = col2.number_input("Timeout per command (seconds)", min_value=1.0, value=DEFAULT_TIMEOUT,
+                                    step=10.0, disabled=running)
+        
+        if st.button(f"Run {len(commands)} commands", type="primary",
+                     disabled=running or (runner_kind == "SSH" and not ssh_host)):
+            batch = BatchRun(commands, build_runner(runner_kind, ssh_host, ssh_user, ssh_port),
+                             concurrency=concurrency, timeout=timeout)
+            key = ("batch", uuid.uuid4().hex)
+            get_job_manager("batch").submit(key, batch.run)
+            st.session_state.batch_run = batch
+            st.session_state.batch_job = key
+            st.session_state.batch_messages = []
+            st.session_state.batch_stored = None
+            running = True
+        
+        if running:
+            render_batch_job()
+        elif st.session_state.get('batch_run') is not None:
+            for level, message in st.session_state.get('batch_messages', []):
+                getattr(st, level)(message)
+            render_batch_results(st.session_state.batch_run)
+
+def get_asset_gateways(lookup_table):
+    """
+    Gateways of the assets of the hierarchy fetched in this session (Download Hierarchy page),
+    rebuilt only when the hierarchy or the lookup table changed. None without a hierarchy.
+    """
+    df_hierarchy = st.session_state.get('df_hierarchy')
+    df_listname = st.session_state.get('df_listname')
+    if df_hierarchy is None or df_listname is None:
+        return None
+    table = lookup_table.table() if isinstance(lookup_table, LookupStore) else lookup_table
+    cached = st.session_state.get('asset_gateways')
+    if cached is None or cached[0] is not df_hierarchy or cached[1] is not df_listname or cached[2] is not table:
+        join = AssetGateways(df_hierarchy, df_listname, table, tree_index=st.session_state.get('tree_index'))
+        cached = (df_hierarchy, df_listname, table, join)
+        st.session_state.asset_gateways = cached
+    return cached[3]
+
+def render_hierarchy_input(lookup_table):
+    """Gateway serial numbers of the factories, zones or assets picked in the fetched hierarchy"""
+    join = get_asset_gateways(lookup_table)
+    if join is None:
+        st.info("Fetch a database in the Download Hierarchy page first to select gateways by factory, zone or asset.")
+        return []
+    
+    all_gateways = st.checkbox(f"All gateways of the database ({st.session_state.get('database', '')})")
+    names = st.multiselect(
+        "Factories, zones or assets:",
+        join.container_names,
+        disabled=all_gateways,
+        help="Every gateway below the selected items is used (all items with the same name are included)"
+    )
+    gateways = join.all_gateways() if all_gateways else join.gateways_under(names)
+    
+    unknown = int(gateways["serial"].isna().sum())
+    if len(gateways):
+        st.caption(f"{len(gateways) - unknown} gateways found")
+    if unknown:
+        st.warning(f"⚠️ {unknown} gateway MAC addresses of these assets are not in the lookup table: "
+                   f"{', '.join(gateways.loc[gateways['serial'].isna(), 'mac'].head(20))}"
+                   f"{'...' if unknown > 20 else ''}")
+    return gateways["serial"].dropna().tolist()
 
 def initialize_lookup_table():
-    """Initialize the lookup table from file or default data"""
-    # Try to load from default file first
-    file_lookup = load_lookup_from_file(DEFAULT_LOOKUP_FILE)
+    """Initialize the lookup table from the store or default data (with a message on where it comes from)"""
+    store = get_lookup_store()
     
-    if file_lookup:
-        st.success(f"✅ Lookup table loaded from {DEFAULT_LOOKUP_FILE}")
-        return file_lookup
+    if len(store):
+        st.success(f"✅ Lookup table loaded from {DEFAULT_LOOKUP_STORE} ({len(store)} gateways)")
+        return store
     else:
         # Fall back to default data - show info about file location
         st.info(f"📁 File `{DEFAULT_LOOKUP_FILE}` not found. Using the default table.")
         st.info(f"💡 Tip: Place your CSV file in: `{os.path.abspath(DEFAULT_LOOKUP_FILE)}`")
         return parse_lookup_csv(DEFAULT_LOOKUP_DATA)
 
+def use_session_table(table):
+    """Make `table` the lookup table of this session, remembering the shared table it replaces for saving"""
+    st.session_state.lookup_table = table
+    st.session_state.lookup_base = get_lookup_store().table()
+
+def get_lookup_table():
+    """
+    The table used by this session: the LookupTable uploaded or edited in the
+    Lookup Table tab if any, otherwise the shared LookupStore.
+    """
+    if st.session_state.get('lookup_table') is not None:
+        return st.session_state.lookup_table
+    store = get_lookup_store()
+    return store if len(store) else parse_lookup_csv(DEFAULT_LOOKUP_DATA)
+
 @secure_page
 def render_batch_diagnostic():
 
     st.title("Batch Diagnostic")
     st.markdown("Generate commands for multiple gateways at once.")
 
-    # Initialize session state for lookup table if not exists
+    # Sessions share the lookup store; lookup_table only holds a table uploaded or edited in this session
     if 'lookup_table' not in st.session_state:
-        st.session_state.lookup_table = initialize_lookup_table()
+        initialize_lookup_table()
+        st.session_state.lookup_table = None
 
     # Add a button to reload from file
     if st.button("🔄 Reload table from file"):
-        file_lookup = load_lookup_from_file(DEFAULT_LOOKUP_FILE)
-        if file_lookup:
-            st.session_state.lookup_table = file_lookup
-            st.success("Lookup table reloaded from file!")
+        written = load_lookup_from_file(DEFAULT_LOOKUP_FILE)
+        if written is not None:
+            st.session_state.lookup_table = None
+            st.success(f"Lookup table reloaded from file! ({written} rows updated)")
         else:
             st.warning("Could not reload from file, using the current table")
 
+    lookup_table = get_lookup_table()
+
     # --- Tabs for different input methods ---
-    input_tab, lookup_tab = st.tabs(["Gateway Input", "Lookup Table"])
+    input_tab, lookup_tab, fleet_tab = st.tabs(["Gateway Input", "Lookup Table", "Fleet Results"])
 
     # --- Input Tab ---
     with input_tab:
@@ -133,19 +450,19 @@ def render_batch_diagnostic():
         with col1:
             input_method = st.radio(
                 "Input method:",
-                ["Text", "File"],
+                ["Text", "File", "Hierarchy"],
                 key="input_method"
             )
             
             gateway_list = []
             if input_method == "Text":
                 gateway_text = st.text_area(
-                    "List of gateway serial numbers (one per line):",
+                    "List of gateway serial numbers or MAC addresses (one per line):",
                     height=200,
                     placeholder="12345\n67890\n54321"
                 )
                 gateway_list = parse_gateway_list(gateway_text)
-            else:
+            elif input_method == "File":
                 uploaded_file = st.file_uploader(
                     "Upload a text file with serial numbers (one per line):",
                     type=["txt"]
@@ -153,6 +470,8 @@ def render_batch_diagnostic():
                 if uploaded_file is not None:
                     gateway_text = uploaded_file.getvalue().decode("utf-8")
                     gateway_list = parse_gateway_list(gateway_text)
+            elif input_method == "Hierarchy":
+                gateway_list = render_hierarchy_input(lookup_table)
         
         with col2:
             st.subheader("Command to execute")
@@ -182,7 +501,8 @@ def render_batch_diagnostic():
             else:
                 command_template = selected_command
 
-            st.info("The {SERIAL} and {MAC} macros will be replaced with the corresponding values. MAC addresses are automatically converted to lowercase.")
+            macros = ", ".join(f"{{{name}}}" for name in MACROS)
+            st.info(f"The {macros} macros will be replaced with the corresponding values. MAC addresses are automatically converted to lowercase, without separators.")
             
         # Generate and display commands
         if gateway_list:
@@ -190,47 +510,43 @@ def render_batch_diagnostic():
             
             commands, missing = generate_commands(
                 gateway_list, 
-                st.session_state.lookup_table,
+                lookup_table,
                 command_template
             )
             
-            # Show missing gateways
+            # The same gateway entered several times (e.g. by serial and by MAC) gets one command
+            duplicates = len(gateway_list) - len(missing) - len(commands)
+            if duplicates:
+                st.info(f"ℹ️ {duplicates} duplicate entries ignored (one command per gateway)")
+            
+            # Show entries matched by MAC address or with another case
+            matched = int((commands["match"] != "serial").sum())
+            if matched:
+                st.info(f"ℹ️ {matched} entries matched by MAC address or case-insensitive serial number")
+            
+            # Show missing gateways, with the nearest known ones
             if missing:
-                st.warning(f"⚠️ {len(missing)} gateways not found in the lookup table: {', '.join(missing)}")
+                st.warning(f"⚠️ {len(missing)} gateways not found in the lookup table")
+                with st.expander("Missing gateways and suggestions", expanded=len(missing) <= 20):
+                    st.dataframe(suggestions_table(missing, lookup_table), hide_index=True)
+                    if len(missing) > MAX_SUGGESTED:
+                        st.caption(f"Suggestions are shown for the first {MAX_SUGGESTED} missing gateways")
             
             # Display generated commands
-            if commands:
+            if len(commands):
                 st.success(f"✅ {len(commands)} commands generated")
                 
-                # Format for display and copy
-                all_commands_text = "\n".join([cmd["command"] for cmd in commands])
-                
-                # Display commands in a code block
-                st.markdown("<div class='multi-command-display'><strong>Commands to execute:</strong></div>", unsafe_allow_html=True)
-                st.code(all_commands_text, language="bash")
-                
-                # Add to history
+                # Add to history (only the last 20 are kept)
                 if st.button("Add all commands to history"):
-                    for cmd in commands:
-                        add_to_history(cmd["command"])
+                    for command in commands["command"].tail(20):
+                        add_to_history(command)
                     st.success(f"{len(commands)} commands added to history!")
                 
-                # Generate putty commands (for later use if needed)
-                putty_cmds = []
+                render_script_download(commands)
                 
-                # Option to download as batch file
-                st.download_button(
-                    label="Download as .bat file",
-                    data=all_commands_text,
-                    file_name="gateway_commands.bat",
-                    mime="text/plain"
-                )
+                render_command_preview(commands)
                 
-                # Display in table format for reference
-                with st.expander("See details for each gateway"):
-                    data = [{"Serial Number": cmd["serial"], "MAC Address": cmd["mac"], "Command": cmd["command"]} 
-                            for cmd in commands]
-                    st.table(data)
+                render_execution(commands)
             else:
                 st.info("No commands were generated. Check the lookup table.")
 
@@ -266,7 +582,7 @@ def render_batch_diagnostic():
                 )
                 if uploaded_csv is not None:
                     csv_data = uploaded_csv.getvalue().decode("utf-8")
-                    st.session_state.lookup_table = parse_lookup_csv(csv_data)
+                    use_session_table(parse_lookup_csv(csv_data))
                     st.success("Table updated from the uploaded file!")
             
             elif lookup_method == "Edit manually":
@@ -276,7 +592,7 @@ def render_batch_diagnostic():
                     height=200
                 )
                 if st.button("Update table"):
-                    st.session_state.lookup_table = parse_lookup_csv(csv_editor)
+                    use_session_table(parse_lookup_csv(csv_editor))
                     st.success("Lookup table updated!")
             
             elif lookup_method == "Reload from file":
@@ -289,28 +605,29 @@ def render_batch_diagnostic():
                     st.warning("⚠️ File not found")
                 
                 if st.button("Reload now"):
-                    file_lookup = load_lookup_from_file(DEFAULT_LOOKUP_FILE)
-                    if file_lookup:
-                        st.session_state.lookup_table = file_lookup
-                        st.success("Table reloaded from file!")
+                    written = load_lookup_from_file(DEFAULT_LOOKUP_FILE)
+                    if written is not None:
+                        st.session_state.lookup_table = None
+                        st.success(f"Table reloaded from file! ({written} rows updated)")
                     else:
                         st.error(f"File not found at: {os.path.abspath(DEFAULT_LOOKUP_FILE)}")
         
         with col2:
             st.subheader("Table Preview")
-            lookup_df = pd.DataFrame(
-                list(st.session_state.lookup_table.items()), 
-                columns=["Serial Number", "MAC Address"]
+            if isinstance(lookup_table, LookupStore):
+                lookup_frame = lookup_table.table().frame
+            else:
+                lookup_frame = lookup_table.frame
+            lookup_df = lookup_frame.rename(
+                columns={"serial_number": "Serial Number", "mac_address": "MAC Address"}
             )
             st.dataframe(lookup_df)
             
-            st.markdown("**Note:** MAC addresses are automatically converted to lowercase")
+            st.markdown("**Note:** MAC addresses are automatically converted to lowercase, without separators")
             
             # Export current lookup table
             if st.button("Export current table"):
-                lookup_csv = "serial_number,mac_address\n"
-                for sn, mac in st.session_state.lookup_table.items():
-                    lookup_csv += f"{sn},{mac}\n"
+                lookup_csv = lookup_frame.to_csv(index=False)
                 
                 st.download_button(
                     label="Download CSV",
@@ -319,18 +636,36 @@ def render_batch_diagnostic():
                     mime="text/csv"
                 )
             
-            # Save current table to default file
-            if st.button("💾 Save as default file"):
+            # Save the rows added or changed in this session to the shared default, in one transaction
+            # (rows other sessions saved meanwhile are kept; only explicitly removed rows are deleted)
+            session_table = st.session_state.get('lookup_table')
+            if session_table is not None:
+                base = st.session_state.lookup_base
+                missing = sorted(set(base) - set(session_table))
+                remove_missing = bool(missing) and st.checkbox(
+                    f"Also remove the {len(missing)} gateways of the default table missing from this one",
+                    value=False
+                )
+                if st.button("💾 Save as default table"):
+                    try:
+                        written = get_lookup_store().save_changes(
+                            session_table, base, removed=missing if remove_missing else ()
+                        )
+                        st.session_state.lookup_table = None
+                        st.success(f"Table saved to {DEFAULT_LOOKUP_STORE} ({written} rows updated)")
+                    except Exception as e:
+                        st.error(f"Error while saving: {str(e)}")
+            
+            # Write the shared table back to the CSV file (replaced atomically)
+            if st.button("📄 Export default table to file"):
                 try:
-                    lookup_csv = "serial_number,mac_address\n"
-                    for sn, mac in st.session_state.lookup_table.items():
-                        lookup_csv += f"{sn},{mac}\n"
-                    
-                    with open(DEFAULT_LOOKUP_FILE, 'w', encoding='utf-8') as f:
-                        f.write(lookup_csv)
-                    
-                    st.success(f"Table saved to {DEFAULT_LOOKUP_FILE}")
+                    get_lookup_store().export_csv(DEFAULT_LOOKUP_FILE)
+                    st.success(f"Table exported to {DEFAULT_LOOKUP_FILE}")
                 except Exception as e:
-                    st.error(f"Error while saving: {str(e)}")
+                    st.error(f"Error while exporting: {str(e)}")
+
+    # --- Fleet Results Tab ---
+    with fleet_tab:
+        render_fleet_results()
 
 render_batch_diagnostic()
\ No newline at end of file
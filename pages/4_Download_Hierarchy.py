@@ -1,14 +1,205 @@
+import uuid
+from functools import partial
 import streamlit as st
 import pandas as pd
 from src.api import Api  # Your existing API class file
+from src.cache import HierarchyCache
+from src.client_pool import ClientPool
+from src.compact import compact_hierarchy, compact_listname, frame_memory
 from src.auth import secure_page
+from src.export import EXPORT_FORMATS, build_exports, read_artifact, remove_exports
+from src.jobs import fetch_job_key, get_job_manager, run_hierarchy_fetch
+from src.multi_db import MAX_DATABASES, combine_hierarchies, fetch_databases
+from src.tree import TreeIndex, select_rows
 
-# Cache CSV conversion for better performance
-@st.cache_data
-def convert_df_to_csv(df):
+TYPE_LABELS = {16777221: "Factory", 33554432: "Asset", 16777222: "Zone"}
+MAX_BRANCH_OPTIONS = 1000  # branches listed in the picker at a time; the search box narrows them
+
+
+@st.cache_resource
+def get_client_pool():
+    """Authenticated API clients shared by every session of this server process."""
+    return ClientPool()
+
+
+def connect_database(db_id: str):
+    """Pooled client of the current account for `db_id`; logs in only the first time. Returns True or an error message."""
+    api_client = st.session_state.api_client
+    client = get_client_pool().client(api_client.server, api_client.username, api_client.password, db_id)
+    if isinstance(client, str):
+        return client
+    st.session_state.api_client = client
+    return True
+
+
+def prepare_exports():
+    """
+    Writes the CSV / CSV.gz / Parquet downloads of the current hierarchy once,
+    replacing those of the previous fetch. The download buttons then only read files.
+    """
+    if st.session_state.get('export_artifacts'):
+        remove_exports(st.session_state.export_artifacts)
+    api_client = st.session_state.api_client
+    export_id = f"{api_client.server}_{dataset_name()}_{uuid.uuid4().hex[:8]}"
+    with st.spinner("Preparing downloads..."):
+        st.session_state.export_artifacts = build_exports(
+            {"hierarchy": st.session_state.df_hierarchy, "listname": st.session_state.df_listname},
+            export_id,
+        )
+
+
+def dataset_name():
+    """Name of the fetched data in download file names: the database, or the multi-database label."""
+    return st.session_state.get('dataset_name') or st.session_state.database
+
+
+def fetch_multiple_databases(db_names, workers, max_databases, cache, refresh, compact, adaptive, max_rate):
+    """Fetches several databases concurrently, with one progress bar per database."""
+    dbs = [db for db in st.session_state.dbs if db['name'] in db_names]
+    placeholders = {db['name']: st.empty() for db in dbs}
+    status_icons = {"pending": "⏳", "running": "🔄", "done": "✅", "partial": "⚠️", "failed": "❌"}
+
+    def render(fetches):
+        for fetch in fetches:
+            placeholders[fetch.name].progress(
+                fetch.fraction, text=f"{status_icons[fetch.status]} {fetch.name}: {fetch.text or fetch.status}"
+            )
+
+    fetches = fetch_databases(
+        st.session_state.api_client, dbs, workers=workers, max_databases=max_databases,
+        cache=cache, refresh=refresh, resume=True, adaptive=adaptive, max_rate=max_rate, on_update=render,
+    )
+    for fetch in fetches:
+        for message in fetch.errors:
+            st.error(f"{fetch.name}: {message}")
+    return fetches, combine_hierarchies(fetches, compact=compact)
+
+
+def to_csv_bytes(df):
     return df.to_csv(index=False).encode('utf-8')
 
 
+def get_branch_labels():
+    """
+    (names, labels) of the factories, assets and zones of the hierarchy, as Series
+    indexed by row in pre-order; built once per tree index and kept next to it.
+    """
+    index = st.session_state.tree_index
+    cached = st.session_state.get('branch_labels')
+    if cached is not None and cached[0] is index:
+        return cached[1]
+    containers = index.containers()
+    if not len(containers):
+        names = labels = pd.Series([], dtype=object)
+        st.session_state.branch_labels = (index, (names, labels))
+        return names, labels
+    container_rows = select_rows(st.session_state.df_hierarchy, containers)
+    databases = container_rows['database'] if 'database' in container_rows.columns else [None] * len(containers)
+    names = pd.Series(container_rows['name'].astype(object).to_numpy(), index=containers)
+    labels = pd.Series([
+        "  " * int(index.depth[row]) + f"{TYPE_LABELS[index.types[row]]}: {name}" + (f" ({db})" if db else "")
+        for row, name, db in zip(containers.tolist(), names, databases)
+    ], index=containers, dtype=object)
+    st.session_state.branch_labels = (index, (names, labels))
+    return names, labels
+
+
+def render_subtree_picker():
+    """Selects a factory / asset / zone and exports only its branch of the hierarchy."""
+    st.subheader("Branch Export")
+    df_hierarchy = st.session_state.df_hierarchy
+    if st.session_state.get('tree_index') is None:
+        st.session_state.tree_index = TreeIndex.from_hierarchy(df_hierarchy)
+    index = st.session_state.tree_index
+    names, labels = get_branch_labels()
+    if not len(labels):
+        st.info("No factory, asset or zone in this hierarchy.")
+        return
+
+    search = st.text_input("Search branches", placeholder="Part of a factory, asset or zone name")
+    options = labels[labels.str.contains(search.strip(), case=False, regex=False)] if search.strip() else labels
+    if not len(options):
+        st.info("No branch matches this search.")
+        return
+    if len(options) > MAX_BRANCH_OPTIONS:
+        st.caption(f"First {MAX_BRANCH_OPTIONS} of {len(options)} branches; search to narrow the list.")
+        options = options.iloc[:MAX_BRANCH_OPTIONS]
+    row = st.selectbox("Branch", options.index.tolist(), format_func=labels.get)
+    type_filter = st.multiselect(
+        "Only these types (all rows when empty)", list(TYPE_LABELS), format_func=TYPE_LABELS.get
+    )
+    rows = index.subtree(row, types=type_filter or None)
+
+    breadcrumb = [labels[ancestor].strip() for ancestor in index.ancestors(row) if ancestor in labels]
+    if breadcrumb:
+        st.caption(" › ".join(breadcrumb))
+    st.metric("Rows in branch", len(rows))
+    branch = select_rows(df_hierarchy, rows)
+    st.dataframe(branch.head(10))
+    st.download_button(
+        label="Download Branch CSV",
+        # Serialised only when clicked
+        data=partial(to_csv_bytes, branch),
+        file_name=f"{dataset_name()}_{names[row]}_branch.csv",
+        mime="text/csv",
+    )
+
+
+@st.fragment(run_every=1.0)
+def render_fetch_job():
+    """Polls this session's background fetch and takes over its result once it finished."""
+    job = get_job_manager().get(st.session_state.fetch_job)
+    if job is not None and not job.finished:
+        st.progress(job.fraction, text=job.text or "Fetching hierarchy data...")
+        if len(job.owners) > 1:
+            st.caption(f"Shared with {len(job.owners) - 1} other session(s) fetching the same database.")
+        return
+
+    st.session_state.fetch_job = None
+    if job is None:
+        st.session_state.fetch_messages = [("error", "The fetch job is no longer available, please fetch again.")]
+    else:
+        st.session_state.fetch_messages = list(job.messages)
+    if job is not None and job.status == "done":
+        h_df, l_df, telemetry = job.result
+        if st.session_state.fetch_compact:
+            h_df, l_df = compact_hierarchy(h_df), compact_listname(l_df)
+        st.session_state.df_hierarchy = h_df
+        st.session_state.df_listname = l_df
+        st.session_state.fetch_telemetry = telemetry
+        st.session_state.dataset_name = None
+        st.session_state.tree_index = TreeIndex.from_hierarchy(h_df)
+        prepare_exports()
+        st.session_state.fetch_messages.append(("success", "Data fetched successfully!"))
+    st.rerun(scope="app")
+
+
+def render_fetch_telemetry(telemetry):
+    """Collapsible panel with the request and stage measurements of the last fetch."""
+    with st.expander("📡 Fetch telemetry"):
+        summary = telemetry.summary()
+        if not summary["requests"]:
+            st.write("No API request was made (result served from the local cache).")
+        else:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Requests", summary["requests"], delta=f"{summary['errors']} errors" if summary["errors"] else None,
+                        delta_color="inverse")
+            col2.metric("Received", f"{summary['bytes_received'] / 1e6:.1f} MB",
+                        help=f"{summary['wire_bytes'] / 1e6:.1f} MB on the wire")
+            col3.metric("Latency (mean / p95)", f"{summary['latency_mean'] or 0:.2f}s / {summary['latency_p95'] or 0:.2f}s")
+            col4.metric("JSON decode", f"{summary['decode_time']:.2f}s")
+
+        stages = telemetry.stages_frame()
+        if not stages.empty:
+            st.markdown("**Stage timings (seconds)**")
+            st.bar_chart(stages.set_index("stage"))
+
+        requests_df = telemetry.requests_frame()
+        if not requests_df.empty:
+            st.markdown("**Requests**")
+            st.dataframe(requests_df, use_container_width=True)
+
+
 @secure_page
 def render_hierarchy_page():
     st.title("I-CARE API Data Extractor")
@@ -79,12 +270,15 @@ def render_hierarchy_page():
                     selected_db = next((db for db in st.session_state.dbs if db['name'] == selected_db_name), None)
                     if selected_db:
                         with st.spinner(f"Switching to database {selected_db_name}..."):
-                            success = st.session_state.api_client.login_step2_select_db(selected_db['db'])
+                            success = connect_database(selected_db['db'])
                             if success is True:
                                 st.session_state.database = selected_db_name
                                 # Clear old hierarchy data when switching databases
                                 st.session_state.df_hierarchy = None
                                 st.session_state.df_listname = None
+                                st.session_state.export_artifacts = None
+                                st.session_state.tree_index = None
+                                st.session_state.fetch_job = None
                                 st.success(f"Successfully switched to database: {selected_db_name}")
                                 st.rerun()
                             else:
@@ -94,9 +288,13 @@ def render_hierarchy_page():
 
         if st.button("Logout"):
             # Clear all iSee-related session state on logout
+            if st.session_state.get('export_artifacts'):
+                remove_exports(st.session_state.export_artifacts)
             keys_to_clear = [
                 'username', 'password', 'server', 'logged_in', 'dbs', 'database', 'database_selected',
-                'df_hierarchy', 'df_listname', 'api_client'
+                'df_hierarchy', 'df_listname', 'api_client', 'fetch_telemetry', 'export_artifacts',
+                'dataset_name', 'tree_index', 'branch_labels', 'fetch_job', 'fetch_compact', 'fetch_messages',
+                'asset_gateways'
             ]
             for key in keys_to_clear:
                 st.session_state[key] = None if key not in ['logged_in', 'database_selected'] else False
@@ -105,15 +303,13 @@ def render_hierarchy_page():
         if st.button("Login"):
             if username and password:
                 with st.spinner("Logging in..."):
-                    # Create new Api instance with credentials
-                    api = Api(username, password)
-                    db_list = api.login_step1_get_dbs(server)
-                    if isinstance(db_list, list):
-                        st.session_state.api_client = api
-                        st.session_state.dbs = db_list
+                    # Shared client of this account: only the first session pays the login round-trip
+                    result = get_client_pool().login(server, username, password)
+                    if isinstance(result, tuple):
+                        st.session_state.api_client, st.session_state.dbs = result
                         st.success("Login successful! Please select a database below.")
                     else:
-                        st.error(db_list)  # error message from API
+                        st.error(result)  # error message from API
             else:
                 st.warning("Please enter both username and password.")
 
@@ -128,7 +324,7 @@ def render_hierarchy_page():
             selected_db = next((db for db in st.session_state.dbs if db['name'] == selected_db_name), None)
             if selected_db:
                 with st.spinner(f"Connecting to database {selected_db_name}..."):
-                    success = st.session_state.api_client.login_step2_select_db(selected_db['db'])
+                    success = connect_database(selected_db['db'])
                     if success is True:
                         st.session_state.database = selected_db_name
                         st.session_state.logged_in = True
@@ -136,6 +332,9 @@ def render_hierarchy_page():
                         # Clear old data on new DB connect
                         st.session_state.df_hierarchy = None
                         st.session_state.df_listname = None
+                        st.session_state.export_artifacts = None
+                        st.session_state.tree_index = None
+                        st.session_state.fetch_job = None
                         st.success(f"Connected to database: {selected_db_name}")
                         st.rerun()
                     else:
@@ -153,27 +352,112 @@ def render_hierarchy_page():
             st.write("Session state data:")
             st.write(st.session_state)
 
+        # Number of asset pages requested in parallel (1 = sequential)
+        workers = st.slider(
+            "Parallel page requests",
+            min_value=1,
+            max_value=Api.MAX_WORKERS,
+            value=4,
+            help="Number of asset pages fetched concurrently from the API. Use 1 for sequential fetching."
+        )
+
+        # Local on-disk cache of fetched hierarchies
+        use_cache = st.checkbox("Use local hierarchy cache", value=True)
+        cache = HierarchyCache() if use_cache else None
+        refresh = "auto"
+        if cache is not None:
+            api_client = st.session_state.api_client
+            cache_info = cache.info(api_client.server, api_client.database)
+            if cache_info:
+                st.caption(
+                    f"Cached copy: {cache_info['rows']} records, fetched {cache_info['age'] / 60:.0f} min ago"
+                    + ("" if cache.is_fresh(cache_info) else " (stale)")
+                )
+            refresh_labels = {
+                "Use cache when fresh": "auto",
+                "Fetch new pages only": "incremental",
+                "Full refresh": "full",
+            }
+            refresh = refresh_labels[st.radio("Cache mode", list(refresh_labels), horizontal=True)]
+
+        adaptive = st.checkbox(
+            "Adaptive page size and concurrency",
+            value=True,
+            help="Tune page size and parallel requests (up to the slider value) from the server's latency and errors."
+        )
+        max_rate = st.number_input(
+            "Max requests per second (0 = unlimited)", min_value=0.0, value=0.0, step=1.0, disabled=not adaptive
+        )
+
+        compact = st.checkbox(
+            "Compact in-memory representation",
+            value=True,
+            help="Keep the hierarchy with categorical names, integer-coded ids and flat paths to reduce session memory."
+        )
+
         # Fetch hierarchy button
-        if st.button("Fetch Asset Hierarchy"):
-            with st.spinner("Fetching hierarchy data..."):
-                h_df, l_df = st.session_state.api_client.get_hierarchy()
+        # The fetch runs as a background job: the page stays usable and polls its progress
+        if st.button("Fetch Asset Hierarchy", disabled=st.session_state.get('fetch_job') is not None):
+            api_client = st.session_state.api_client
+            # resume=True checkpoints every page, so a failed page does not lose the download
+            job, attached = get_job_manager().submit(
+                fetch_job_key(api_client), run_hierarchy_fetch, owner=api_client.username,
+                api=api_client, workers=workers, cache=cache, refresh=refresh, resume=True,
+                adaptive=adaptive, max_rate=max_rate or None,
+            )
+            st.session_state.fetch_job = job.key
+            st.session_state.fetch_compact = compact
+            st.session_state.fetch_messages = []
+            if attached:
+                st.info("This database is already being fetched; following that download instead of starting another.")
+
+        if st.session_state.get('fetch_job') is not None:
+            render_fetch_job()
+        for level, message in st.session_state.get('fetch_messages') or []:
+            getattr(st, level)(message)
+
+        # --- Several databases at once, each with its own token ---
+        with st.expander("🗂️ Fetch several databases"):
+            db_names = st.multiselect("Databases", [db['name'] for db in st.session_state.dbs or []])
+            max_databases = st.slider(
+                "Databases fetched concurrently", min_value=1, max_value=MAX_DATABASES, value=min(2, MAX_DATABASES),
+                help="Each database also uses the parallel page requests set above."
+            )
+            if st.button("Fetch Selected Databases", disabled=not db_names):
+                fetches, (h_df, l_df) = fetch_multiple_databases(
+                    db_names, workers, max_databases, cache, refresh, compact, adaptive, max_rate or None
+                )
+                # Per-database telemetry is not merged; the panel below shows single fetches only
+                st.session_state.fetch_telemetry = None
                 if h_df is not None and l_df is not None:
                     st.session_state.df_hierarchy = h_df
                     st.session_state.df_listname = l_df
-                    st.success("Data fetched successfully!")
-                    st.rerun()
+                    succeeded = [fetch.name for fetch in fetches if fetch.df_hierarchy is not None]
+                    st.session_state.dataset_name = f"{len(succeeded)}_databases"
+                    st.session_state.tree_index = TreeIndex.from_hierarchy(h_df)
+                    prepare_exports()
+                    # No rerun: keep the per-database errors above visible
+                    st.success(f"Fetched {len(succeeded)} of {len(fetches)} databases.")
                 else:
-                    st.error("Failed to fetch hierarchy data.")
+                    st.error("No database could be fetched.")
+
+        # Telemetry of the last fetch: where the time went (latency, payload, decode, processing)
+        telemetry = st.session_state.get('fetch_telemetry')
+        if telemetry is not None:
+            render_fetch_telemetry(telemetry)
 
         # Display data and download options
         if st.session_state.df_hierarchy is not None and st.session_state.df_listname is not None:
             st.markdown("---")
             st.subheader("Data Summary")
-            col1, col2 = st.columns(2)
+            col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Hierarchy records", len(st.session_state.df_hierarchy))
             with col2:
                 st.metric("Asset records", len(st.session_state.df_listname))
+            with col3:
+                memory_bytes = frame_memory(st.session_state.df_hierarchy) + frame_memory(st.session_state.df_listname)
+                st.metric("Memory footprint", f"{memory_bytes / 1e6:.1f} MB")
 
             st.subheader("Hierarchy Data Preview")
             st.dataframe(st.session_state.df_hierarchy.head(10))
@@ -181,24 +465,27 @@ def render_hierarchy_page():
             st.subheader("List Name Data Preview")
             st.dataframe(st.session_state.df_listname.head(10))
 
+            render_subtree_picker()
+
             st.subheader("Download Data")
-            col1, col2 = st.columns(2)
-            with col1:
-                csv_hierarchy = convert_df_to_csv(st.session_state.df_hierarchy)
-                st.download_button(
-                    label="Download Hierarchy CSV",
-                    data=csv_hierarchy,
-                    file_name=f"{st.session_state.database}_hierarchy.csv",
-                    mime="text/csv",
-                )
-            with col2:
-                csv_listname = convert_df_to_csv(st.session_state.df_listname)
-                st.download_button(
-                    label="Download List Name CSV",
-                    data=csv_listname,
-                    file_name=f"{st.session_state.database}_listname.csv",
-                    mime="text/csv",
-                )
+            if not st.session_state.get('export_artifacts'):
+                prepare_exports()
+            labels = {"hierarchy": "Hierarchy", "listname": "List Name"}
+            for name, label in labels.items():
+                artifacts = st.session_state.export_artifacts.get(name, {})
+                columns = st.columns(len(EXPORT_FORMATS))
+                for column, (export_format, (extension, mime)) in zip(columns, EXPORT_FORMATS.items()):
+                    with column:
+                        path = artifacts.get(export_format)
+                        st.download_button(
+                            label=f"Download {label} {export_format.upper()}",
+                            # Read from disk only when clicked; nothing is re-serialised on reruns
+                            data=partial(read_artifact, path) if path else b"",
+                            file_name=f"{dataset_name()}_{name}.{extension}",
+                            mime=mime,
+                            disabled=path is None,
+                            key=f"download_{name}_{export_format}",
+                        )
     elif st.session_state.logged_in:
         st.info("Please select a database to continue.")
     else:
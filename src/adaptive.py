@@ -0,0 +1,146 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+from src.progress import logger
+
+# Settled settings are logged as `isee.adaptive`, with the level and handler of the isee logger
+adaptive_logger = logger.getChild("adaptive")
+
+# Page sizes are MAX_PAGE_SIZE / 2^k (from the default 1000): requests stay aligned on its grid
+MIN_PAGE_SIZE = 250
+MAX_PAGE_SIZE = 4000
+TARGET_LATENCY = 8.0     # seconds; slower requests count as back-pressure
+RECOVER_AFTER = 20       # fast successes before split pages grow back
+
+
+@dataclass
+class ServerSettings:
+    """What the controller settled on for one server; the starting point of its next fetch."""
+    page_size: int = 1000
+    concurrency: float = 4.0
+
+
+# Learned settings per server, for the lifetime of the process
+_settings = {}
+_settings_lock = threading.Lock()
+
+
+def learned_settings(server: str) -> ServerSettings:
+    with _settings_lock:
+        return _settings.get(server) or ServerSettings()
+
+
+class AdaptiveController:
+    """
+    AIMD control of asset pagination against one server:
+    - concurrency: the number of requests in flight grows by about one per
+      round of fast successes (additive increase) and is halved on an error or
+      a timeout (multiplicative decrease),
+    - page size: on timeouts and responses slower than target_latency, pages are split in halves
+      (down to MIN_PAGE_SIZE) and merged back after RECOVER_AFTER fast successes.
+      Halving keeps every request aligned on the page grid of `page_size`, so the
+      p/count pagination, checkpoints and caching stay valid within a fetch.
+      The base page size only grows between fetches (settle()), one doubling at
+      a time up to max_page_size, when a fetch ran without back-pressure and its
+      slowest request leaves room for twice the page within target_latency;
+      an incomplete fetch leaves the learned settings unchanged,
+    - max_rate: requests started per second never exceed this (None = unlimited).
+    Decreases are applied at most once per target_latency, so one congestion
+    event seen by many in-flight requests only halves once.
+    """
+
+    def __init__(self, server: str, page_size: int, max_concurrency: int, max_rate: float = None,
+                 start_concurrency: float = None, target_latency: float = TARGET_LATENCY,
+                 min_page_size: int = MIN_PAGE_SIZE, max_page_size: int = MAX_PAGE_SIZE):
+        self.server = server
+        self.max_page_size = max_page_size
+        page_size = min(page_size, max_page_size)
+        self.base_page_size = page_size
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.min_page_size = min(min_page_size, page_size)
+        self.window = float(min(start_concurrency or self.max_concurrency, self.max_concurrency))
+        self.split = 1
+        self.backpressure = 0
+        self.requests = 0
+        self.slowest = 0.0
+        self._fast_streak = 0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._condition = threading.Condition()
+
+    @classmethod
+    def for_server(cls, server: str, max_concurrency: int, max_rate: float = None,
+                   target_latency: float = TARGET_LATENCY, max_page_size: int = MAX_PAGE_SIZE) -> "AdaptiveController":
+        """Controller starting from what was learned on `server` by earlier fetches."""
+        settings = learned_settings(server)
+        return cls(server, settings.page_size, max_concurrency, max_rate=max_rate,
+                   start_concurrency=settings.concurrency, target_latency=target_latency,
+                   max_page_size=max_page_size)
+
+    @property
+    def page_size(self) -> int:
+        return self.base_page_size // self.split
+
+    def acquire(self):
+        """Blocks until a request may start: a free concurrency slot and, with max_rate, its turn."""
+        with self._condition:
+            while self._in_flight >= max(1, int(self.window)):
+                self._condition.wait()
+            self._in_flight += 1
+            delay = 0.0
+            if self.max_rate:
+                now = time.monotonic()
+                start = max(now, self._next_start)
+                self._next_start = start + 1.0 / self.max_rate
+                delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, latency: float, ok: bool, timeout: bool = False):
+        """Records the outcome of a request started with acquire()."""
+        with self._condition:
+            self._in_flight -= 1
+            self.requests += 1
+            slow = latency > self.target_latency
+            if ok:
+                self.slowest = max(self.slowest, latency)
+            if ok and not slow:
+                self.window = min(self.max_concurrency, self.window + 1.0 / self.window)
+                self._fast_streak += 1
+                if self.split > 1 and self._fast_streak >= RECOVER_AFTER:
+                    self.split //= 2
+                    self._fast_streak = 0
+            else:
+                self._fast_streak = 0
+                self.backpressure += 1
+                now = time.monotonic()
+                if now - self._last_decrease >= self.target_latency:
+                    self._last_decrease = now
+                    if not ok:
+                        self.window = max(1.0, self.window / 2)
+                    if (timeout or slow) and self.page_size // 2 >= self.min_page_size:
+                        self.split *= 2
+            self._condition.notify_all()
+
+    def settle(self, complete: bool) -> ServerSettings:
+        """
+        Stores and logs the settings for the next fetch from this server. After an
+        incomplete fetch the learned settings are kept as they were (and returned).
+        """
+        if not complete:
+            adaptive_logger.info("adaptive pagination on %s: incomplete fetch after %d requests "
+                                 "(%d with back-pressure), settings unchanged",
+                                 self.server, self.requests, self.backpressure)
+            return learned_settings(self.server)
+        page_size = self.page_size
+        if not self.backpressure and self.split == 1 and self.slowest * 2 < self.target_latency:
+            page_size = min(self.max_page_size, self.base_page_size * 2)
+        settings = ServerSettings(page_size=page_size, concurrency=round(self.window, 2))
+        with _settings_lock:
+            _settings[self.server] = settings
+        adaptive_logger.info("adaptive pagination on %s: %s after %d requests (%d with back-pressure)",
+                             self.server, asdict(settings), self.requests, self.backpressure)
+        return settings
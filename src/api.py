@@ -1,10 +1,47 @@
 # iseeapi_streamlite.py
 
-import streamlit as st
 import requests
 import json
+import math
+import threading
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
+from urllib3.util.retry import Retry
+from src.adaptive import MAX_PAGE_SIZE, TARGET_LATENCY, AdaptiveController
+from src.cache import HierarchyCache
+from src.checkpoint import FetchCheckpoint, make_fetch_id
+from src.compact import compact_hierarchy, compact_listname, frame_memory
+from src.hierarchy import AssetBuffer, build_hierarchy
+from src.progress import ProgressReporter, logger
+from src.stream_json import iter_array_items
+from src.telemetry import FetchTelemetry, RequestRecord
+
+
+def build_session(pool_size: int = 16, retries: int = 3, backoff: float = 0.5):
+    """
+    Creates a requests session tuned for the iSee API: a connection pool sized
+    for concurrent page fetchers (blocking instead of opening extra connections),
+    and retries with exponential backoff on idempotent GETs for connection errors
+    and transient 429/5xx responses. Once retries are exhausted the last response
+    is returned, so callers still see its status code.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class Api:
     """
@@ -12,16 +49,38 @@ class Api:
     and data processing.
     """
     SERVER_RESPONSE = ("EU", "US", "PR")
+    PAGE_SIZE = 1000
+    MAX_WORKERS = 8
+    POOL_SIZE = 16
+    TIMEOUT = (10, 60)  # (connect, read) seconds for asset requests
+    ADAPTIVE_ATTEMPTS = 3  # failed sub-page requests retried (with smaller pages) before a page fails
+    STREAM_JSON = True  # decode asset pages incrementally into AssetBuffer columns (see src/stream_json.py)
+    STREAM_CHUNK = 64 * 1024
     username = None
     password = None
 
-    def __init__(self,username,password):
+    def __init__(self, username, password, base_url: str = None, session: requests.Session = None):
         self.username = username
         self.password = password
         self.database = None
-        self.headers = {"Accept-Language": "en", "Accept": "application/json"}
+        self.headers = {"Accept-Language": "en", "Accept": "application/json", "Accept-Encoding": "gzip, deflate"}
         self.urlserver = None
-        self.session = requests.session()
+        self.server = None
+        # Token of login step 1, from which a token per database can be requested
+        self.user_token = None
+        # Overrides https://isee<urlserver>.icareweb.com, e.g. to target a local mock server
+        self.base_url = base_url
+        # Requests and stage timings of the last get_hierarchy call
+        self.telemetry = FetchTelemetry()
+        # Shared by the concurrent page fetchers (and by clients of the same ClientPool); headers are passed per request
+        self.session = session or build_session(pool_size=self.POOL_SIZE)
+        # time.time() of the last successful login step, and the lock serialising token refreshes
+        self.logged_in_at = None
+        self._login_lock = threading.Lock()
+
+    @property
+    def api_root(self) -> str:
+        return self.base_url or f"https://isee{self.urlserver}.icareweb.com"
 
     def login_step1_get_dbs(self, server: str):
         """
@@ -31,6 +90,7 @@ class Api:
         if server not in self.SERVER_RESPONSE:
             return f"'{server}' is an unknown server."
 
+        self.server = server
         if server == "US":
             self.urlserver = "-us"
         elif server == "PR":
@@ -38,7 +98,7 @@ class Api:
         else: # "EU"
             self.urlserver = ""
 
-        loginurl = f"https://isee{self.urlserver}.icareweb.com/apiv4/login/"
+        loginurl = f"{self.api_root}/apiv4/login/"
 
         try:
             response_login = self.session.post(
@@ -50,7 +110,9 @@ class Api:
             response_login.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
             user = response_login.json()
+            self.user_token = user['token']
             self.headers["Authorization"] = f"Bearer {user['token']}"
+            self.logged_in_at = time.time()
             dbs = sorted(user.get("dbs", []), key=lambda db: db['name'])
             return dbs
         except requests.exceptions.RequestException as e:
@@ -65,7 +127,7 @@ class Api:
         Returns True on success or an error message string on failure.
         """
         self.database = db_id
-        loginurl = f"https://isee{self.urlserver}.icareweb.com/apiv4/login/"
+        loginurl = f"{self.api_root}/apiv4/login/"
         chooseurl = loginurl + self.database
 
         try:
@@ -74,6 +136,7 @@ class Api:
 
             user = response_database.json()
             self.headers["Authorization"] = f"Bearer {user['token']}"
+            self.logged_in_at = time.time()
             return True
         except requests.exceptions.RequestException as e:
             return f"Database selection failed. A network error occurred: {e}"
@@ -81,133 +144,379 @@ class Api:
             return f"An unexpected error occurred selecting the database: {e}"
 
 
-    def get_hierarchy(self):
+    def for_database(self, db_id: str):
+        """
+        Returns a new client logged in to `db_id` with its own token, sharing this
+        client's user login and connection pool, so several databases can be fetched
+        concurrently. Requires login_step1_get_dbs; returns an error message string on failure.
+        """
+        if db_id == self.database and self.logged_in_at is not None:
+            # Already logged in to that database: reuse the token, no round-trip
+            return self.clone()
+        client = self.clone()
+        client.headers["Authorization"] = f"Bearer {self.user_token}"
+        success = client.login_step2_select_db(db_id)
+        return client if success is True else success
+
+    def clone(self):
+        """
+        A copy of this client with the same server, tokens and connection pool but
+        its own telemetry, so it can run a fetch while this client is used elsewhere.
+        """
+        client = Api(self.username, self.password, base_url=self.base_url, session=self.session)
+        client.server = self.server
+        client.urlserver = self.urlserver
+        client.user_token = self.user_token
+        client.database = self.database
+        client.headers = dict(self.headers)
+        client.logged_in_at = self.logged_in_at
+        return client
+
+    def refresh_token(self, expired_header: str = None) -> bool:
+        """
+        Repeats both login steps after the token expired. When several threads see
+        the expired token, only the first one logs in again: the others find that
+        the Authorization header already changed since `expired_header`.
+        Returns True when a valid token is in place.
+        """
+        with self._login_lock:
+            if expired_header is not None and self.headers.get("Authorization") != expired_header:
+                return True
+            logger.info("token expired on %s/%s, logging in again", self.server, self.database)
+            dbs = self.login_step1_get_dbs(self.server)
+            if not isinstance(dbs, list):
+                return False
+            return self.database is None or self.login_step2_select_db(self.database) is True
+
+
+    def _fetch_assets_page(self, page: int, page_size: int = None, controller: AdaptiveController = None):
+        """
+        Fetches a single page of assets (of page_size assets, PAGE_SIZE by default).
+        Returns a (page, status_code, AssetBuffer) tuple; the buffer is None when the request failed
+        (after the session's retries), with the error name in place of the status code on network errors.
+        With a controller, see _fetch_adaptive_page.
+        """
+        page_size = page_size or self.PAGE_SIZE
+        if controller is not None:
+            return self._fetch_adaptive_page(page, page_size, controller)
+        url = f"{self.api_root}/apiv4/assets/?p={page}&count={page_size}"
+        try:
+            response, assets = self._get_assets(url)
+        except requests.exceptions.RequestException as e:
+            return page, type(e).__name__, None
+        return page, response.status_code, assets
+
+    def _fetch_adaptive_page(self, page: int, page_size: int, controller: AdaptiveController):
+        """
+        Fetches page `page` of page_size assets as the sub-pages the controller
+        currently asks for (page_size / 2^k assets each, so the requests stay on
+        the p/count grid), each request throttled by and reported to the controller.
+        A failed request is retried, with smaller sub-pages after timeouts, up to
+        ADAPTIVE_ATTEMPTS times. Same return value as _fetch_assets_page.
+        """
+        end = page * page_size
+        offset = (page - 1) * page_size
+        buffer = AssetBuffer()
+        attempts = 0
+        while offset < end:
+            size = min(controller.page_size, end - offset)
+            while size > 1 and offset % size:
+                size //= 2
+            url = f"{self.api_root}/apiv4/assets/?p={offset // size + 1}&count={size}"
+            controller.acquire()
+            request_start = time.perf_counter()
+            try:
+                response, assets = self._get_assets(url)
+            except requests.exceptions.RequestException as e:
+                controller.release(time.perf_counter() - request_start, ok=False,
+                                   timeout=isinstance(e, requests.exceptions.Timeout))
+                attempts += 1
+                if attempts > self.ADAPTIVE_ATTEMPTS:
+                    return page, type(e).__name__, None
+                continue
+            controller.release(time.perf_counter() - request_start, ok=assets is not None)
+            if assets is None:
+                attempts += 1
+                if attempts > self.ADAPTIVE_ATTEMPTS:
+                    return page, response.status_code, None
+                continue
+            buffer.extend(assets)
+            attempts = 0
+            offset += size
+            if len(assets) < size:
+                break  # end of the listing
+        return page, 200, buffer
+
+    def _send(self, url: str, stream: bool = False):
+        """GETs `url`; on an expired token (401) logs in again once and retries."""
+        authorization = self.headers.get("Authorization")
+        response = self.session.get(url, headers=self.headers, timeout=self.TIMEOUT, stream=stream)
+        if response.status_code == 401 and self.refresh_token(expired_header=authorization):
+            response.close()
+            response = self.session.get(url, headers=self.headers, timeout=self.TIMEOUT, stream=stream)
+        return response
+
+    def _get_assets(self, url: str):
+        """
+        GETs an assets page. Returns (response, AssetBuffer), the buffer being None
+        for non-200 responses. With STREAM_JSON the body is decoded as it arrives and
+        only the used fields of each asset reach the columnar buffer, so the page is
+        never held as one JSON document; otherwise it goes through _get_json.
+        Telemetry is recorded as in _get_json (decode_time: time spent parsing).
         """
-        Fetches and processes the asset hierarchy. Uses st.progress for UI feedback.
+        if not self.STREAM_JSON:
+            response, payload = self._get_json(url)
+            if payload is None:
+                return response, None
+            return response, AssetBuffer.from_assets(payload.get('_embedded', []))
+
+        started_at = time.time()
+        start = time.perf_counter()
+        record = RequestRecord(url=url, status=None, duration=0.0, decode_time=0.0, bytes_received=0,
+                               wire_bytes=-1, started_at=started_at)
+        try:
+            response = self._send(url, stream=True)
+            record.status = response.status_code
+            record.wire_bytes = int(response.headers.get('Content-Length', -1))
+            if response.status_code != 200:
+                record.bytes_received = len(response.content)
+                return response, None
+            read_time = 0.0
+            chunks = response.iter_content(chunk_size=self.STREAM_CHUNK)
+
+            def timed_chunks():
+                nonlocal read_time
+                while True:
+                    read_start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    read_time += time.perf_counter() - read_start
+                    if chunk is None:
+                        return
+                    record.bytes_received += len(chunk)
+                    yield chunk
+
+            buffer = AssetBuffer()
+            decode_start = time.perf_counter()
+            try:
+                for asset in iter_array_items(timed_chunks(), "_embedded"):
+                    buffer.add(asset)
+            except ValueError as e:
+                # Malformed or truncated body: reported like a failed response.json()
+                response.close()
+                raise requests.exceptions.InvalidJSONError(f"Invalid assets page: {e}", response=response)
+            record.decode_time = time.perf_counter() - decode_start - read_time
+            return response, buffer
+        except requests.exceptions.RequestException as e:
+            record.status = type(e).__name__
+            raise
+        finally:
+            record.duration = time.perf_counter() - start - record.decode_time
+            self.telemetry.record_request(record)
+
+    def _get_json(self, url: str):
+        """
+        GETs `url` and decodes its JSON body when the status is 200, recording the
+        request duration, status, sizes and decode time in self.telemetry.
+        Returns (response, payload); payload is None for non-200 responses.
+        Network errors are recorded, then re-raised.
+        """
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            response = self._send(url)
+        except requests.exceptions.RequestException as e:
+            self.telemetry.record_request(RequestRecord(
+                url=url, status=type(e).__name__, duration=time.perf_counter() - start,
+                decode_time=0.0, bytes_received=0, wire_bytes=-1, started_at=started_at,
+            ))
+            raise
+        duration = time.perf_counter() - start
+        payload = None
+        decode_start = time.perf_counter()
+        if response.status_code == 200:
+            payload = response.json()
+        decode_time = time.perf_counter() - decode_start
+        self.telemetry.record_request(RequestRecord(
+            url=url, status=response.status_code, duration=duration, decode_time=decode_time,
+            bytes_received=len(response.content), wire_bytes=int(response.headers.get('Content-Length', -1)),
+            started_at=started_at,
+        ))
+        return response, payload
+
+    def get_hierarchy(self, workers: int = 1, cache: HierarchyCache = None, refresh: str = "auto",
+                      resume: bool = False, reporter: ProgressReporter = None, compact: bool = False,
+                      adaptive: bool = False, max_rate: float = None):
+        """
+        Fetches and processes the asset hierarchy. Progress, warnings and errors are
+        sent to `reporter` (see src/progress.py); nothing is reported when it is None.
+        With workers > 1, asset pages are requested concurrently from a thread pool;
+        the assembled DataFrames are the same as with the sequential path.
+
+        When a HierarchyCache is given, `refresh` selects how it is used:
+        - "auto": return the cached result if it is fresh, otherwise fetch everything.
+        - "incremental": reuse the cached assets and only fetch the pages past the
+          last complete cached page. The assets endpoint offers no modified-since
+          filter, so this relies on new assets being appended to the listing;
+          a shrinking total falls back to a full fetch.
+        - "full": ignore the cached result and fetch everything.
+        The result of any fetch is written back to the cache.
+
+        With resume=True every fetched page is checkpointed to disk (see
+        src/checkpoint.py); a download that failed or was interrupted restarts
+        from the pages it had already completed.
+
+        With compact=True the hierarchy is returned as a CompactHierarchy and the
+        listname frame with categorical columns (see src/compact.py), to reduce
+        the memory held per session.
+
+        With adaptive=True, pages are adaptive.MAX_PAGE_SIZE assets, fetched as
+        aligned requests whose size (MIN_PAGE_SIZE up to the whole page) and number
+        in flight (up to `workers`) are tuned from observed latency and errors,
+        starting from what earlier fetches learned on this server; see
+        src/adaptive.py. Pages, and so checkpoints, stay on that fixed grid
+        whatever the request size. max_rate caps the requests started per second.
         Returns two DataFrames (hierarchy, listname) on success, or (None, None) on failure.
         """
-        # ... (The initial data fetching part remains the same) ...
+        reporter = reporter or ProgressReporter()
+        controller = None
+        if adaptive:
+            # A request using a quarter of the read timeout already counts as back-pressure
+            controller = AdaptiveController.for_server(self.server, workers, max_rate=max_rate,
+                                                       target_latency=min(TARGET_LATENCY, self.TIMEOUT[1] / 4))
+        # Fixed page grid: requests of the controller are aligned offsets within these pages
+        page_size = MAX_PAGE_SIZE if controller is not None else self.PAGE_SIZE
+        self.telemetry = telemetry = FetchTelemetry(context={"server": self.server, "database": self.database})
+        if cache is not None and refresh == "auto":
+            cached = cache.load(self.server, self.database)
+            if cached is not None:
+                df_hierarchy, df_listname, _ = cached
+                return self._compact(df_hierarchy, df_listname, reporter) if compact else (df_hierarchy, df_listname)
+
         try:
-            url = f"https://isee{self.urlserver}.icareweb.com/apiv4/assets/?p=1&count=25"
-            response = self.session.get(url, headers=self.headers, timeout=20)
+            url = f"{self.api_root}/apiv4/assets/?p=1&count=25"
+            response, payload = self._get_json(url)
             response.raise_for_status()
-            total_assets = response.json()['_meta']['total']
+            total_assets = payload['_meta']['total']
             if total_assets == 0:
-                st.warning("No assets found in this database.")
+                reporter.warning("No assets found in this database.")
                 return pd.DataFrame(), pd.DataFrame()
         except Exception as e:
             # Simplified error handling for brevity
-            st.error(f"Failed to fetch initial asset data: {e}")
+            reporter.error(f"Failed to fetch initial asset data: {e}")
             return None, None
 
-        # ... (The while loop for paginating through assets remains the same) ...
-        page = 1
-        nbr_assets = 0
-        dictoname = {}
-        hierarchy = []
-        listname = []
-        progress_bar = st.progress(0, text=f"Preparing to fetch {total_assets} assets...")
-        with st.spinner("Fetching data from API..."):
-            while nbr_assets < total_assets:
-                url = f"https://isee{self.urlserver}.icareweb.com/apiv4/assets/?p={page}&count=1000"
-                response = self.session.get(url, headers=self.headers)
-                if response.status_code != 200:
-                    st.error(f"Error fetching page {page}. Status: {response.status_code}")
-                    break
-                assets_data = response.json()
-                for asset in assets_data.get('_embedded', []):
-                    # ... (The asset processing logic inside the loop is unchanged) ...
-                    if 'mac' in asset.get('optionals', {}):
-                        listname.append({'_id': asset['_id'], 'name': asset['name'], 'mac': asset['optionals']['mac']})
-                    elif 'coordinators' in asset.get('optionals', {}):
-                        listname.append({'_id': asset['_id'], 'name': asset['name'], 'mac': asset['optionals']['coordinators'][0].replace(':', '').lower()})
-                    # ... etc ...
-                    else:
-                        listname.append({'_id': asset['_id'], 'name': asset['name'], 'criticality': "", 'equipment_type': ""})
-                    dictoname[asset['_id']] = asset['name']
-                    path_info = {"paths": asset['path'], "name": asset['name'], "_id": asset['_id'], "type": asset['t']}
-                    for i, path_id in enumerate(asset['path'], 1):
-                        path_info[f"level{i}"] = dictoname.get(path_id, "Unknown Path ID")
-                    hierarchy.append(path_info)
-                    nbr_assets += 1
-                page += 1
-                progress_bar.progress(min(nbr_assets / total_assets, 1.0), text=f"Fetched {nbr_assets} / {total_assets} assets...")
-        progress_bar.empty()
-        if not hierarchy:
-            st.warning("No hierarchy data was extracted.")
+        # --- Reuse complete cached pages on incremental refresh ---
+        buffer = AssetBuffer()
+        first_page = 1
+        if cache is not None and refresh == "incremental":
+            cached_buffer, meta = cache.load_assets(self.server, self.database)
+            # Cached assets are in listing order, so any page size can resume after them
+            if cached_buffer is not None and total_assets >= meta['total']:
+                complete_pages = min(meta['total'], len(cached_buffer)) // page_size
+                buffer = cached_buffer.head(complete_pages * page_size)
+                first_page = complete_pages + 1
+
+        # --- Pages already saved by an interrupted download ---
+        fetch_start = time.perf_counter()
+        num_pages = math.ceil(total_assets / page_size)
+        pages = range(first_page, num_pages + 1)
+        fetched = {}
+        checkpoint = None
+        if resume:
+            checkpoint = FetchCheckpoint(make_fetch_id(self.server, self.database, page_size))
+            checkpoint.begin(total_assets)
+            for page in checkpoint.completed_pages().intersection(pages):
+                try:
+                    fetched[page] = checkpoint.load_page(page)
+                except (OSError, ValueError, KeyError):
+                    pass
+            if fetched:
+                reporter.info(f"Resuming download: {len(fetched)} page(s) restored from the last attempt.")
+        to_fetch = [page for page in pages if page not in fetched]
+
+        # --- Page fetching (sequential or concurrent) ---
+        workers = max(1, min(int(workers), len(to_fetch) or 1))
+        failed_page = None
+        nbr_assets = len(buffer) + sum(len(assets) for assets in fetched.values())
+        reporter.progress(min(nbr_assets / total_assets, 1.0), text=f"Preparing to fetch {total_assets - nbr_assets} assets...")
+        with reporter.stage("Fetching data from API..."):
+            if workers == 1:
+                for page in to_fetch:
+                    _, status, assets = self._fetch_assets_page(page, page_size, controller)
+                    if status != 200:
+                        failed_page = (page, status)
+                        break
+                    fetched[page] = assets
+                    if checkpoint is not None:
+                        checkpoint.save_page(page, assets)
+                    nbr_assets += len(assets)
+                    reporter.progress(min(nbr_assets / total_assets, 1.0), text=f"Fetched {nbr_assets} / {total_assets} assets...")
+            else:
+                # Pages are fetched out of order but assembled in page order below,
+                # so the resulting DataFrames match the sequential path.
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(self._fetch_assets_page, page, page_size, controller) for page in to_fetch]
+                    for future in as_completed(futures):
+                        if future.cancelled():
+                            continue
+                        page, status, assets = future.result()
+                        if status != 200:
+                            if failed_page is None or page < failed_page[0]:
+                                failed_page = (page, status)
+                            for pending in futures:
+                                pending.cancel()
+                            continue
+                        fetched[page] = assets
+                        if checkpoint is not None:
+                            checkpoint.save_page(page, assets)
+                        nbr_assets += len(assets)
+                        reporter.progress(min(nbr_assets / total_assets, 1.0), text=f"Fetched {nbr_assets} / {total_assets} assets...")
+
+        if failed_page is not None:
+            reporter.error(f"Error fetching page {failed_page[0]}. Status: {failed_page[1]}")
+            if checkpoint is not None:
+                reporter.info(f"{len(fetched)} page(s) are saved; fetch again to resume the download.")
+        elif checkpoint is not None:
+            checkpoint.clear()
+
+        # --- Collect every asset first (in page order), resolve paths afterwards ---
+        for page in pages:
+            if page not in fetched:
+                break
+            buffer.extend(fetched[page])
+        telemetry.record_stage('fetch', time.perf_counter() - fetch_start)
+        if controller is not None:
+            controller.settle(complete=failed_page is None)
+        reporter.done()
+        if not len(buffer):
+            reporter.warning("No hierarchy data was extracted.")
             return None, None
 
         # --- Pandas Processing ---
-        with st.spinner("Processing data with Pandas..."):
-            df_hierarchy = pd.DataFrame(hierarchy)
-            df_listname = pd.DataFrame(listname)
-            
-            if 'level1' in df_hierarchy.columns:
-                df_hierarchy = df_hierarchy[df_hierarchy['level1'] != 'Recycle bin'].reset_index(drop=True)
-            
-            # Make a copy to work with
-            df_processed = df_hierarchy.copy()
-
-            # Define the helper function once to be used by all blocks
-            def get_string_from_list(list_elem):
-                return str(max(list_elem, default='noid'))
-
-            # ------------------- Factory Extraction -------------------
-            try:
-                df_factory = df_hierarchy[df_hierarchy['type'] == 16777221]
-                factory_id_list = df_factory['_id'].unique().tolist()
-                def get_factory_id(path):
-                    return list(set(factory_id_list).intersection(path))
-                df_processed['Factory_id'] = df_processed['paths'].apply(get_factory_id)
-                df_processed['Factory_id'] = df_processed['Factory_id'].apply(get_string_from_list)
-                df_factory = df_factory[['name', '_id']].rename(columns={'name': 'factory_name', '_id': 'Factory_id'})
-                print("factory ", len(df_factory))
-                df_processed = pd.merge(df_processed, df_factory, on='Factory_id', how='left')
-            except Exception as e:
-                print('no factory extracted ', e)
-                df_processed['Factory_id'] = 'nullFid'
-                df_processed['factory_name'] = 'nullFn'
-            
-            # ------------------- Asset Extraction -------------------
-            try:
-                df_asset = df_hierarchy[df_hierarchy['type'] == 33554432]
-                asset_id_list = df_asset['_id'].unique().tolist()
-                def get_asset_id(path):
-                    return list(set(asset_id_list).intersection(path))
-                df_processed['Asset_id'] = df_processed['paths'].apply(get_asset_id)
-                df_processed['Asset_id'] = df_processed['Asset_id'].apply(get_string_from_list)
-                df_asset = df_asset[['name', '_id']].rename(columns={'name': 'asset_name', '_id': 'Asset_id'})
-                print("asset ", len(df_asset))
-                df_processed = pd.merge(df_processed, df_asset, on='Asset_id', how='left')
-            except Exception as e:
-                print('no asset extracted ', e)
-                df_processed['Asset_id'] = 'null_Aid'
-                df_processed['asset_name'] = 'nullAn'
+        with reporter.stage("Processing data with Pandas..."):
+            build_timings = {}
+            df_processed, df_listname = build_hierarchy(buffer, timings=build_timings)
+        for stage, seconds in build_timings.items():
+            telemetry.record_stage(stage, seconds)
 
-            # ------------------- Zone Extraction -------------------
+        # Only complete fetches are cached, a partial one would be served as fresh
+        if cache is not None and failed_page is None:
             try:
-                df_zone = df_hierarchy[df_hierarchy['type'] == 16777222]
-                zone_id_list = df_zone['_id'].unique().tolist()
-                def get_zone_id(path):
-                    return list(set(zone_id_list).intersection(path))
-                df_processed['Zone_id'] = df_processed['paths'].apply(get_zone_id)
-                df_processed['Zone_id'] = df_processed['Zone_id'].apply(get_string_from_list)
-                df_zone = df_zone[['name', '_id']].rename(columns={'name': 'zone_name', '_id': 'Zone_id'})
-                print("zone ", len(df_zone))
-                df_processed = pd.merge(df_processed, df_zone, on='Zone_id', how='left')
+                cache.store(self.server, self.database, buffer, df_processed, df_listname,
+                            total=total_assets, page_size=page_size)
             except Exception as e:
-                print("No zone extract", e)
-                df_processed['Zone_id'] = 'nullZid'
-                df_processed['zone_name'] = 'nullZn'
-
-            # --- Final Column Reordering ---
-            end_columns = [
-                'name', '_id', 'type', 
-                'Factory_id', 'factory_name', 
-                'Asset_id', 'asset_name', 
-                'Zone_id', 'zone_name'
-            ]
-            front_columns = [col for col in df_processed.columns if col not in end_columns]
-            df_processed = df_processed[front_columns + end_columns]
-            
-        return df_processed, df_listname
\ No newline at end of file
+                logger.warning("hierarchy cache not written: %s", e)
+
+        if compact:
+            df_processed, df_listname = self._compact(df_processed, df_listname, reporter)
+        telemetry.log_summary()
+        return df_processed, df_listname
+
+    def _compact(self, df_hierarchy, df_listname, reporter: ProgressReporter):
+        """Converts get_hierarchy results to their compact form and reports the memory saved."""
+        plain_bytes = frame_memory(df_hierarchy) + frame_memory(df_listname)
+        with reporter.stage("Compacting hierarchy..."), self.telemetry.timed('compact'):
+            compact_h, compact_l = compact_hierarchy(df_hierarchy), compact_listname(df_listname)
+        compact_bytes = frame_memory(compact_h) + frame_memory(compact_l)
+        reporter.info(f"Compact hierarchy: {compact_bytes / 1e6:.1f} MB in memory (plain frames: {plain_bytes / 1e6:.1f} MB).")
+        return compact_h, compact_l
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from src.compact import CompactHierarchy
+from src.lookup import normalize_macs
+from src.tree import TreeIndex
+
+
+class AssetGateways:
+    """
+    Gateways of the assets of a fetched hierarchy: the MACs of the listname
+    frame joined with a gateway lookup table (LookupTable or LookupStore) on the
+    normalised MAC, through the lookup's MAC hash index.
+    gateways_under() expands factory, zone or asset names to every gateway of
+    their subtrees (TreeIndex slices, then one hash lookup of the subtree ids).
+    Build it once per (hierarchy, lookup table) pair and keep it.
+    """
+
+    def __init__(self, df_hierarchy, df_listname: pd.DataFrame, lookup_table, tree_index: TreeIndex = None):
+        self.tree = tree_index if tree_index is not None else TreeIndex.from_hierarchy(df_hierarchy)
+        frame = df_hierarchy.frame if isinstance(df_hierarchy, CompactHierarchy) else df_hierarchy
+        names = frame['name'].astype(object).astype(str).str.strip().str.lower().to_numpy()
+
+        # Lower-cased name -> rows, for the containers (factories, assets, zones) of the hierarchy
+        containers = self.tree.containers()
+        self.container_names = sorted({frame['name'].iloc[row] for row in containers})
+        self._rows_by_name = pd.Series(containers).groupby(names[containers]).agg(list).to_dict()
+
+        # Listname rows with a MAC, joined with the lookup on the MAC
+        if 'mac' in df_listname.columns:
+            with_mac = df_listname[df_listname['mac'].notna()]
+            macs = normalize_macs(with_mac['mac'].astype(object))
+        else:
+            with_mac = df_listname.iloc[0:0]
+            macs = pd.Series([], dtype="string")
+        serials = lookup_table.index().serials_of_macs(macs)
+        self.assets = pd.DataFrame({
+            '_id': with_mac['_id'].astype(object).to_numpy(),
+            'mac': macs.to_numpy(),
+            'serial': serials.to_numpy(),
+        })
+        self._asset_ids = pd.Index(self.assets['_id'])
+
+    def rows_named(self, names) -> np.ndarray:
+        """Hierarchy rows of the factories, assets and zones with these names (case-insensitive)."""
+        rows = [row for name in names for row in self._rows_by_name.get(str(name).strip().lower(), [])]
+        return np.unique(np.asarray(rows, dtype=np.int64))
+
+    def gateways_of_rows(self, rows) -> pd.DataFrame:
+        """Distinct (serial, mac) of the listname assets among hierarchy `rows`; serial is <NA> for unknown MACs."""
+        ids = self.tree.ids[np.asarray(rows, dtype=np.int64)]
+        positions = self._asset_ids.get_indexer_for(ids)
+        matched = self.assets.iloc[positions[positions >= 0]]
+        return matched[['serial', 'mac']].drop_duplicates('mac').reset_index(drop=True)
+
+    def gateways_under(self, names) -> pd.DataFrame:
+        """Gateways below (and of) the factories, assets and zones with these names."""
+        rows = self.rows_named(names)
+        if not len(rows):
+            return self.gateways_of_rows([])
+        subtrees = np.concatenate([self.tree.subtree(row) for row in rows])
+        return self.gateways_of_rows(np.unique(subtrees))
+
+    def all_gateways(self) -> pd.DataFrame:
+        """Gateways of every asset of the hierarchy (listname assets outside it, e.g. in the Recycle bin, are left out)."""
+        in_tree = self._asset_ids.isin(self.tree.ids)
+        return self.assets.loc[in_tree, ['serial', 'mac']].drop_duplicates('mac').reset_index(drop=True)
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import pandas as pd
+from src.hierarchy import AssetBuffer
+from src.progress import logger
+
+CACHE_DIR = os.path.join("data", "cache", "hierarchy")
+DEFAULT_TTL = 24 * 3600             # seconds before a cached hierarchy is considered stale
+DEFAULT_MAX_AGE = 7 * 24 * 3600     # seconds before a stale entry is evicted (kept until then for incremental refresh)
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3   # total size of the cache directory before LRU eviction
+INCOMPLETE_GRACE = 3600             # seconds an entry without meta.json (being written) is left alone
+
+# Entry directory -> lock held while an entry is written, shared by every cache of the process
+_entry_locks = {}
+_entry_locks_lock = threading.Lock()
+
+
+def _entry_lock(entry: str) -> threading.Lock:
+    with _entry_locks_lock:
+        return _entry_locks.setdefault(os.path.abspath(entry), threading.Lock())
+
+
+class HierarchyCache:
+    """
+    On-disk cache of get_hierarchy results, one directory per (server, database).
+    Each entry holds the processed frames and the raw asset columns as Parquet
+    files, plus a meta.json describing the fetch (total, page size, timestamps).
+    Concurrent fetches can share a cache: evict() skips the entries being stored.
+    """
+    FILES = ("assets.parquet", "hierarchy.parquet", "listname.parquet")
+
+    def __init__(self, root: str = CACHE_DIR, ttl: float = DEFAULT_TTL, max_age: float = DEFAULT_MAX_AGE,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    # --- Paths & metadata ---
+    def entry_dir(self, server: str, database: str) -> str:
+        def safe(part):
+            return re.sub(r'[^A-Za-z0-9_.-]', '_', str(part))
+        return os.path.join(self.root, safe(server), safe(database))
+
+    def _read_meta(self, entry: str):
+        try:
+            with open(os.path.join(entry, "meta.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry: str, meta: dict):
+        tmp_path = os.path.join(entry, "meta.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry, "meta.json"))
+
+    def info(self, server: str, database: str):
+        """Returns the meta dict of an entry (with its age in seconds), or None."""
+        meta = self._read_meta(self.entry_dir(server, database))
+        if meta is None:
+            return None
+        return {**meta, "age": time.time() - meta["fetched_at"]}
+
+    def is_fresh(self, meta: dict) -> bool:
+        return meta is not None and time.time() - meta["fetched_at"] <= self.ttl
+
+    # --- Loading ---
+    def load(self, server: str, database: str, allow_stale: bool = False):
+        """
+        Returns (df_hierarchy, df_listname, meta) for a cached entry, or None when
+        there is no entry or it is older than the TTL (unless allow_stale).
+        """
+        entry = self.entry_dir(server, database)
+        meta = self._read_meta(entry)
+        if meta is None or not (allow_stale or self.is_fresh(meta)):
+            return None
+        try:
+            df_hierarchy = pd.read_parquet(os.path.join(entry, "hierarchy.parquet"))
+            df_listname = pd.read_parquet(os.path.join(entry, "listname.parquet"))
+        except Exception as e:
+            logger.warning("hierarchy cache unreadable %s: %s", entry, e)
+            return None
+        # Parquet returns list columns as arrays; restore plain lists
+        if 'paths' in df_hierarchy.columns:
+            df_hierarchy['paths'] = [list(path) for path in df_hierarchy['paths']]
+        self._touch(entry, meta)
+        return df_hierarchy, df_listname, meta
+
+    def load_assets(self, server: str, database: str):
+        """Returns (AssetBuffer, meta) with the raw assets of an entry (stale or not), or (None, None)."""
+        entry = self.entry_dir(server, database)
+        meta = self._read_meta(entry)
+        if meta is None:
+            return None, None
+        try:
+            buffer = AssetBuffer.from_frame(pd.read_parquet(os.path.join(entry, "assets.parquet")))
+        except Exception as e:
+            logger.warning("hierarchy cache unreadable %s: %s", entry, e)
+            return None, None
+        return buffer, meta
+
+    def _touch(self, entry: str, meta: dict):
+        meta["last_access"] = time.time()
+        try:
+            self._write_meta(entry, meta)
+        except OSError:
+            pass
+
+    # --- Storing & eviction ---
+    def store(self, server: str, database: str, buffer: AssetBuffer, df_hierarchy: pd.DataFrame,
+              df_listname: pd.DataFrame, total: int, page_size: int):
+        """
+        Writes an entry. Files are written to temporary names and renamed, and
+        meta.json is written last, so readers never see a half-written entry.
+        """
+        entry = self.entry_dir(server, database)
+        with _entry_lock(entry):
+            os.makedirs(entry, exist_ok=True)
+            frames = (buffer.to_frame(), df_hierarchy, df_listname)
+            for file_name, frame in zip(self.FILES, frames):
+                tmp_path = os.path.join(entry, file_name + ".tmp")
+                frame.to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, os.path.join(entry, file_name))
+            now = time.time()
+            self._write_meta(entry, {
+                "server": server,
+                "database": database,
+                "total": int(total),
+                "page_size": int(page_size),
+                "rows": len(df_hierarchy),
+                "fetched_at": now,
+                "last_access": now,
+            })
+        self.evict()
+
+    def entries(self):
+        """Yields (entry_dir, meta, size_in_bytes, last_modified) for every cached entry."""
+        if not os.path.isdir(self.root):
+            return
+        for server in os.listdir(self.root):
+            server_dir = os.path.join(self.root, server)
+            if not os.path.isdir(server_dir):
+                continue
+            for database in os.listdir(server_dir):
+                entry = os.path.join(server_dir, database)
+                if not os.path.isdir(entry):
+                    continue
+                size, last_modified = 0, os.path.getmtime(entry)
+                for name in os.listdir(entry):
+                    try:
+                        stat = os.stat(os.path.join(entry, name))
+                    except OSError:  # renamed or removed by a writer meanwhile
+                        continue
+                    size += stat.st_size
+                    last_modified = max(last_modified, stat.st_mtime)
+                yield entry, self._read_meta(entry), size, last_modified
+
+    def _remove(self, entry: str) -> bool:
+        """Removes an entry unless it is being stored. Returns True when removed."""
+        lock = _entry_lock(entry)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            shutil.rmtree(entry, ignore_errors=True)
+        finally:
+            lock.release()
+        return True
+
+    def evict(self):
+        """
+        Removes entries older than max_age, then the least recently used ones until
+        under max_bytes. Entries being stored are skipped, and entries without
+        meta.json (interrupted writes) only go once untouched for INCOMPLETE_GRACE.
+        """
+        kept = []
+        now = time.time()
+        for entry, meta, size, last_modified in self.entries():
+            if meta is None:
+                if now - last_modified > INCOMPLETE_GRACE:
+                    self._remove(entry)
+            elif now - meta["fetched_at"] > self.max_age:
+                self._remove(entry)
+            else:
+                kept.append((meta.get("last_access", meta["fetched_at"]), entry, size))
+        total_size = sum(size for _, _, size in kept)
+        for _, entry, size in sorted(kept):
+            if total_size <= self.max_bytes:
+                break
+            if self._remove(entry):
+                total_size -= size
+
+    def clear(self, server: str, database: str):
+        shutil.rmtree(self.entry_dir(server, database), ignore_errors=True)
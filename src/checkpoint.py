@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import shutil
+import time
+from src.hierarchy import AssetBuffer
+from src.progress import logger
+
+CHECKPOINT_DIR = os.path.join("data", "cache", "checkpoints")
+MAX_CHECKPOINT_AGE = 24 * 3600  # seconds; older checkpoints are discarded instead of resumed
+
+
+def make_fetch_id(server: str, database: str, page_size: int) -> str:
+    """
+    Identifies a hierarchy download. It only depends on what is fetched, so a
+    rerun of the same download finds the pages saved by the interrupted one.
+    """
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', f"{server}_{database}_{page_size}")
+
+
+class FetchCheckpoint:
+    """
+    Saves every fetched asset page of a download to disk, so an interrupted or
+    failed download can resume from the pages already completed.
+    """
+
+    def __init__(self, fetch_id: str, root: str = CHECKPOINT_DIR, max_age: float = MAX_CHECKPOINT_AGE):
+        self.fetch_id = fetch_id
+        self.directory = os.path.join(root, fetch_id)
+        self.max_age = max_age
+
+    def _page_path(self, page: int) -> str:
+        return os.path.join(self.directory, f"page_{page:05d}.json")
+
+    def _write_json(self, path: str, data) -> bool:
+        """
+        Best-effort write: the directory is created again if another download removed
+        it, and an OSError only loses the checkpoint, not the download (logged, False).
+        """
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning("checkpoint %s not written: %s", path, e)
+            return False
+
+    def prune_stale(self):
+        """Removes checkpoints of the same server and database saved with another page size."""
+        root, name = os.path.split(self.directory)
+        prefix = re.sub(r'_\d+$', '', name)
+        if not os.path.isdir(root) or prefix == name:
+            return
+        pattern = re.compile(rf'^{re.escape(prefix)}_\d+$')
+        for other in os.listdir(root):
+            if other != name and pattern.match(other):
+                shutil.rmtree(os.path.join(root, other), ignore_errors=True)
+
+    def begin(self, total: int):
+        """
+        Starts or resumes the download of `total` assets. Saved pages are dropped
+        when the asset total changed or the checkpoint is too old, since the page
+        boundaries can no longer be trusted; checkpoints of the same download on
+        another page grid are removed.
+        """
+        self.prune_stale()
+        meta_path = os.path.join(self.directory, "meta.json")
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta["total"] != total or time.time() - meta["started_at"] > self.max_age:
+                self.clear()
+        except (OSError, ValueError, KeyError):
+            self.clear()
+        if not os.path.exists(meta_path):
+            self._write_json(meta_path, {"total": int(total), "started_at": time.time()})
+
+    def completed_pages(self) -> set:
+        if not os.path.isdir(self.directory):
+            return set()
+        return {
+            int(match.group(1))
+            for match in map(re.compile(r'^page_(\d+)\.json$').match, os.listdir(self.directory))
+            if match
+        }
+
+    def save_page(self, page: int, buffer: AssetBuffer) -> bool:
+        return self._write_json(self._page_path(page), {
+            "_id": buffer.ids, "name": buffer.names, "path": buffer.paths, "t": buffer.types, "mac": buffer.macs,
+        })
+
+    def load_page(self, page: int) -> AssetBuffer:
+        with open(self._page_path(page), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        buffer = AssetBuffer()
+        buffer.ids, buffer.names, buffer.paths = data["_id"], data["name"], data["path"]
+        buffer.types, buffer.macs = data["t"], data["mac"]
+        return buffer
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,112 @@
+"""
+Headless hierarchy export, for cron / batch jobs that run without Streamlit.
+
+Usage:
+    python -m src.cli --server EU --database "My DB" --database "Other DB" --output-dir exports
+    python -m src.cli --server US --all-databases --format parquet --cache
+
+Credentials come from --username / --password or the ISEE_USERNAME /
+ISEE_PASSWORD environment variables. With --cache the results are also written
+to the local hierarchy cache, so the Download Hierarchy page opens them instantly.
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+from src.api import Api
+from src.cache import HierarchyCache
+from src.progress import LOG_FORMAT, LoggingReporter, logger
+
+
+def export_frames(df_hierarchy, df_listname, output_dir: str, db_name: str, file_format: str):
+    """Writes the two frames with the same file names as the Download Hierarchy page."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for suffix, df in (("hierarchy", df_hierarchy), ("listname", df_listname)):
+        file_name = re.sub(r'[\\/:*?"<>|]', '_', f"{db_name}_{suffix}.{file_format}")
+        path = os.path.join(output_dir, file_name)
+        if file_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def select_databases(dbs, requested, all_databases: bool):
+    """Matches requested databases by name or id. Returns (selected, unknown names)."""
+    if all_databases:
+        return list(dbs), []
+    selected, unknown = [], []
+    for name in requested:
+        match = next((db for db in dbs if name in (db['name'], db['db'])), None)
+        if match is None:
+            unknown.append(name)
+        else:
+            selected.append(match)
+    return selected, unknown
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export iSee asset hierarchies without the Streamlit UI.")
+    parser.add_argument("--server", choices=Api.SERVER_RESPONSE, default="EU")
+    parser.add_argument("--username", default=os.environ.get("ISEE_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("ISEE_PASSWORD"))
+    parser.add_argument("--database", action="append", default=[], help="Database name or id (repeatable).")
+    parser.add_argument("--all-databases", action="store_true", help="Export every database of the account.")
+    parser.add_argument("--output-dir", default="exports")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--workers", type=int, default=4, help="Asset pages fetched concurrently.")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Tune page size and concurrency (up to --workers) from latency and errors.")
+    parser.add_argument("--max-rate", type=float, default=None, help="Max requests per second with --adaptive.")
+    parser.add_argument("--cache", action="store_true", help="Also store the results in the local hierarchy cache.")
+    parser.add_argument("--refresh", choices=("auto", "incremental", "full"), default="full",
+                        help="Cache mode when --cache is set.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    if not args.username or not args.password:
+        parser.error("credentials are required (--username/--password or ISEE_USERNAME/ISEE_PASSWORD)")
+    if not args.database and not args.all_databases:
+        parser.error("select at least one --database, or --all-databases")
+
+    api = Api(args.username, args.password)
+    dbs = api.login_step1_get_dbs(args.server)
+    if not isinstance(dbs, list):
+        logger.error(dbs)
+        return 1
+
+    selected, unknown = select_databases(dbs, args.database, args.all_databases)
+    for name in unknown:
+        logger.error("Unknown database: %s", name)
+
+    cache = HierarchyCache() if args.cache else None
+    failures = len(unknown)
+    for db in selected:
+        reporter = LoggingReporter(prefix=db['name'])
+        success = api.login_step2_select_db(db['db'])
+        if success is not True:
+            reporter.error(success)
+            failures += 1
+            continue
+        df_hierarchy, df_listname = api.get_hierarchy(
+            workers=args.workers, cache=cache, refresh=args.refresh, resume=True, reporter=reporter,
+            adaptive=args.adaptive, max_rate=args.max_rate,
+        )
+        if df_hierarchy is None or df_listname is None:
+            reporter.error("Failed to fetch hierarchy data.")
+            failures += 1
+            continue
+        for path in export_frames(df_hierarchy, df_listname, args.output_dir, db['name'], args.format):
+            reporter.info(f"Wrote {path}")
+        # A page that could not be fetched leaves a partial export behind
+        if reporter.errors:
+            failures += 1
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
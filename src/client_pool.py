@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from src.api import Api, build_session
+
+TOKEN_TTL = 8 * 3600   # seconds before a pooled client logs in again, ahead of any server-side expiry
+SHARED_POOL_SIZE = 32  # connections kept alive per host, for every pooled client together
+
+
+def credentials_key(server: str, username: str, password: str) -> tuple:
+    """Pool key of an account; the password is only kept as a hash."""
+    return server, username, hashlib.sha256(password.encode('utf-8')).hexdigest()
+
+
+class ClientPool:
+    """
+    Process-wide cache of authenticated Api clients, shared by every Streamlit
+    session (the page keeps one in st.cache_resource):
+    - login() caches the step-1 client and database list of an account,
+    - client() caches one client per (account, database), logged in with step 2.
+    All clients share one keep-alive connection pool. Entries older than
+    token_ttl log in again, and so does a pooled step-1 login when step 2 fails
+    with it; a token rejected earlier (HTTP 401) is renewed by the client itself
+    (Api.refresh_token).
+    Pooled clients are shared: use them read-only, or clone() them to fetch.
+    """
+
+    def __init__(self, token_ttl: float = TOKEN_TTL, base_url: str = None):
+        self.token_ttl = token_ttl
+        self.base_url = base_url
+        self.session = build_session(pool_size=SHARED_POOL_SIZE)
+        self._users = {}     # credentials key -> (client, dbs)
+        self._clients = {}   # credentials key + (db_id,) -> client
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key_lock(self, key) -> threading.Lock:
+        # One lock per entry: concurrent logins of the same account wait for a single round-trip,
+        # logins of other accounts are not blocked
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _expired(self, client: Api) -> bool:
+        return client.logged_in_at is None or time.time() - client.logged_in_at > self.token_ttl
+
+    def login(self, server: str, username: str, password: str):
+        """Step 1, cached. Returns (client, dbs), or an error message string."""
+        key = credentials_key(server, username, password)
+        with self._key_lock(key):
+            entry = self._users.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                return entry
+            client = Api(username, password, base_url=self.base_url, session=self.session)
+            dbs = client.login_step1_get_dbs(server)
+            if not isinstance(dbs, list):
+                self._users.pop(key, None)
+                return dbs
+            self._users[key] = (client, dbs)
+            return client, dbs
+
+    def client(self, server: str, username: str, password: str, db_id: str):
+        """Client logged in to `db_id` (steps 1 and 2, cached). Returns an Api, or an error message string."""
+        key = credentials_key(server, username, password) + (db_id,)
+        with self._key_lock(key):
+            client = self._clients.get(key)
+            if client is not None and not self._expired(client):
+                return client
+            started = time.time()
+            result = self.login(server, username, password)
+            if isinstance(result, str):
+                return result
+            user_client, _ = result
+            client = user_client.for_database(db_id)
+            if isinstance(client, str) and user_client.logged_in_at < started:
+                # The pooled step-1 login may have expired on the server before token_ttl: log in once more
+                self.invalidate(server, username, password)
+                result = self.login(server, username, password)
+                if isinstance(result, str):
+                    return result
+                client = result[0].for_database(db_id)
+            if isinstance(client, str):
+                return client
+            self._clients[key] = client
+            return client
+
+    def invalidate(self, server: str, username: str, password: str):
+        """Forgets every client of an account (e.g. after a password change)."""
+        key = credentials_key(server, username, password)
+        with self._lock:
+            self._users.pop(key, None)
+            for client_key in [k for k in self._clients if k[:3] == key]:
+                del self._clients[client_key]
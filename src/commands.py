@@ -0,0 +1,130 @@
+import re
+import pandas as pd
+
+# Template macro -> column of the resolved gateways frame
+MACROS = {
+    "SERIAL": "serial",
+    "MAC": "mac",
+}
+SCRIPT_CHUNK_ROWS = 10000  # commands joined at a time when writing a script
+
+_MACRO = re.compile(r"\{(\w+)\}")
+
+
+def split_template(template: str, macros: dict = MACROS) -> list:
+    """Template as a list of ('text', literal) and ('macro', column) parts; unknown macros stay literal."""
+    parts = []
+    position = 0
+    for match in _MACRO.finditer(template):
+        column = macros.get(match.group(1))
+        if column is None:
+            continue
+        if match.start() > position:
+            parts.append(("text", template[position:match.start()]))
+        parts.append(("macro", column))
+        position = match.end()
+    if position < len(template):
+        parts.append(("text", template[position:]))
+    return parts
+
+
+def expand_template(template: str, frame: pd.DataFrame, macros: dict = MACROS) -> pd.Series:
+    """The template expanded for every row of `frame`, one column concatenation per template part."""
+    result = pd.Series("", index=frame.index, dtype="string")
+    for kind, value in split_template(template, macros):
+        result = result + (value if kind == "text" else frame[value].astype("string").fillna(""))
+    return result
+
+
+def build_commands(resolved: pd.DataFrame, template: str, macros: dict = MACROS):
+    """
+    Commands for the resolved rows of GatewayIndex.resolve(): returns (commands,
+    missing) with commands a DataFrame of serial, mac, match and command, one row
+    per gateway (entries resolving to an already listed serial are dropped), and
+    missing the list of unresolved inputs.
+    """
+    found = resolved['serial'].notna()
+    commands = resolved.loc[found, ['serial', 'mac', 'match']].drop_duplicates('serial').reset_index(drop=True)
+    commands['command'] = expand_template(template, commands, macros)
+    missing = resolved.loc[~found, 'input'].tolist()
+    return commands, missing
+
+
+def iter_script_chunks(commands: pd.Series, chunk_rows: int = SCRIPT_CHUNK_ROWS):
+    """Encoded script text, one command per line, in chunks of chunk_rows commands."""
+    for start in range(0, len(commands), chunk_rows):
+        chunk = commands.iloc[start:start + chunk_rows]
+        yield ("\n".join(chunk.tolist()) + "\n").encode("utf-8")
+
+
+def script_bytes(commands: pd.Series) -> bytes:
+    return b"".join(iter_script_chunks(commands))
+
+
+# --- Fleet script ---
+
+FLEET_SCRIPT_HEADER = """#!/usr/bin/env bash
+# {count} gateway commands, run {concurrency} at a time with a {timeout}s timeout each.
+# Output of each gateway goes to $OUT_DIR/<mac>.log, one line per gateway to $OUT_DIR/summary.tsv.
+# Usage: bash {name} (CONCURRENCY, TIMEOUT and OUT_DIR can be overridden from the environment)
+set -u
+CONCURRENCY="${{CONCURRENCY:-{concurrency}}}"
+TIMEOUT="${{TIMEOUT:-{timeout}}}"
+OUT_DIR="${{OUT_DIR:-gateway_results_$(date +%Y%m%d_%H%M%S)}}"
+mkdir -p "$OUT_DIR"
+SUMMARY="$OUT_DIR/summary.tsv"
+printf 'serial\\tmac\\tstatus\\texit_code\\tseconds\\n' > "$SUMMARY"
+
+run_one() {{
+    local serial="$1" mac="$2" cmd="$3" start code status
+    start=$(date +%s)
+    timeout --kill-after=5 "$TIMEOUT" bash -c "$cmd" > "$OUT_DIR/$mac.log" 2>&1 < /dev/null
+    code=$?
+    case $code in
+        0) status=ok ;;
+        124|137) status=timeout ;;
+        *) status=failed ;;
+    esac
+    # A single short write per gateway: lines of parallel jobs do not interleave
+    printf '%s\\t%s\\t%s\\t%s\\t%s\\n' "$serial" "$mac" "$status" "$code" "$(( $(date +%s) - start ))" >> "$SUMMARY"
+}}
+
+while IFS=$'\\t' read -r serial mac cmd; do
+    while [ "$(jobs -rp | wc -l)" -ge "$CONCURRENCY" ]; do
+        wait -n
+    done
+    run_one "$serial" "$mac" "$cmd" &
+done <<'__GATEWAYS__'
+"""
+
+FLEET_SCRIPT_FOOTER = """__GATEWAYS__
+wait
+
+awk -F'\\t' 'NR > 1 {{ count[$3]++ }} END {{ for (s in count) printf "%s: %d\\n", s, count[s] }}' "$SUMMARY"
+echo "Outputs and summary.tsv in $OUT_DIR"
+"""
+
+
+def _single_line(values: pd.Series) -> pd.Series:
+    # Tabs and line breaks would split the serial/mac/command records of the script
+    return values.astype("string").fillna("").str.replace(r"[\t\r\n]+", " ", regex=True)
+
+
+def iter_fleet_script_chunks(commands: pd.DataFrame, concurrency: int, timeout: int,
+                             name: str = "gateway_commands.sh", chunk_rows: int = SCRIPT_CHUNK_ROWS):
+    """
+    Encoded bash script running the commands (DataFrame with serial, mac and
+    command columns) `concurrency` at a time, each killed after `timeout`
+    seconds, with one output file per MAC and a summary file.
+    """
+    yield FLEET_SCRIPT_HEADER.format(count=len(commands), concurrency=int(concurrency),
+                                     timeout=int(timeout), name=name).encode("utf-8")
+    records = _single_line(commands["serial"]) + "\t" + _single_line(commands["mac"]) + "\t" + \
+        _single_line(commands["command"])
+    yield from iter_script_chunks(records, chunk_rows)
+    yield FLEET_SCRIPT_FOOTER.format().encode("utf-8")
+
+
+def fleet_script_bytes(commands: pd.DataFrame, concurrency: int, timeout: int,
+                       name: str = "gateway_commands.sh") -> bytes:
+    return b"".join(iter_fleet_script_chunks(commands, concurrency, timeout, name))
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from src.hierarchy import flatten_paths
+
+ID_COLUMNS = ('_id', 'Factory_id', 'Asset_id', 'Zone_id')
+NAME_COLUMNS = ('name', 'factory_name', 'asset_name', 'zone_name')
+
+
+@dataclass
+class PathArray:
+    """
+    All paths stored as one flat array of id codes plus row offsets: the path of
+    row i is ids[values[offsets[i]:offsets[i + 1]]].
+    """
+    offsets: np.ndarray  # int64, len(rows) + 1
+    values: np.ndarray   # int32 codes into `ids`
+    ids: pd.Index        # shared id dictionary
+
+    @classmethod
+    def from_lists(cls, paths, ids: pd.Index) -> "PathArray":
+        rows, _, flat_ids = flatten_paths(paths)
+        lengths = np.bincount(rows, minlength=len(paths)) if len(rows) else np.zeros(len(paths), dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return cls(offsets=offsets, values=ids.get_indexer(flat_ids).astype(np.int32), ids=ids)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> list:
+        return self.ids[self.values[self.offsets[row]:self.offsets[row + 1]]].tolist()
+
+    def to_lists(self, start: int = 0, stop: int = None) -> list:
+        stop = len(self) if stop is None else stop
+        if stop <= start:
+            return []
+        offsets = self.offsets[start:stop + 1]
+        flat = self.ids.to_numpy()[self.values[offsets[0]:offsets[-1]]]
+        return [chunk.tolist() for chunk in np.split(flat, offsets[1:-1] - offsets[0])]
+
+    def take(self, rows) -> list:
+        """Paths of arbitrary rows (e.g. a subtree), as lists of ids."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return []
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        positions = np.repeat(starts - bounds[:-1], lengths) + np.arange(bounds[-1])
+        flat = self.ids.to_numpy()[self.values[positions]]
+        return [chunk.tolist() for chunk in np.split(flat, bounds[1:-1])]
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.values.nbytes
+
+
+@dataclass
+class CompactHierarchy:
+    """
+    Memory-compact form of the hierarchy DataFrame returned by get_hierarchy:
+    - names and levelN columns are categoricals sharing one name dictionary,
+    - id columns are integer-coded categoricals sharing one id dictionary,
+    - paths are offsets into a single flat array of id codes (PathArray).
+    `frame` holds every column except `paths`; to_frame() rebuilds the original.
+    """
+    frame: pd.DataFrame
+    paths: PathArray
+    columns: list  # column order of the original frame
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def ids(self) -> pd.Index:
+        return self.paths.ids
+
+    def to_frame(self, start: int = 0, stop: int = None) -> pd.DataFrame:
+        """Rebuilds the plain DataFrame (optionally only rows start:stop)."""
+        df = self.frame.iloc[start:stop].copy()
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(object)
+        df['paths'] = self.paths.to_lists(start, start + len(df))
+        return df[self.columns].infer_objects()
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self.to_frame(0, min(n, len(self)))
+
+    def take(self, rows) -> pd.DataFrame:
+        """Rebuilds the plain DataFrame of the given row positions, in that order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        df = self.frame.iloc[rows].copy()
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype(object)
+        df['paths'] = self.paths.take(rows)
+        return df[self.columns].infer_objects()
+
+    def memory_usage(self) -> dict:
+        """Footprint in bytes of the frame columns, the paths and the shared dictionaries."""
+        frame_bytes = int(self.frame.index.memory_usage())
+        dictionaries = {}
+        for column in self.frame.columns:
+            values = self.frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                frame_bytes += values.cat.codes.nbytes
+                # Shared dictionaries are counted once
+                dictionaries[id(values.cat.categories)] = int(values.cat.categories.memory_usage(deep=True))
+            else:
+                frame_bytes += int(values.memory_usage(index=False, deep=True))
+        dictionary_bytes = sum(dictionaries.values())
+        return {
+            "frame": frame_bytes,
+            "paths": self.paths.nbytes,
+            "dictionaries": dictionary_bytes,
+            "total": frame_bytes + self.paths.nbytes + dictionary_bytes,
+        }
+
+
+def _dictionary(values) -> pd.Index:
+    """Sorted unique non-null values, as a dictionary for categoricals."""
+    values = pd.Series(values).dropna().unique()
+    return pd.Index(np.sort(values.astype(object)), dtype=object)
+
+
+def compact_hierarchy(df_hierarchy: pd.DataFrame) -> CompactHierarchy:
+    """Converts a get_hierarchy DataFrame into a CompactHierarchy."""
+    columns = list(df_hierarchy.columns)
+    if df_hierarchy.empty or 'paths' not in columns:
+        # e.g. a database without assets (get_hierarchy returns frames without columns)
+        frame = df_hierarchy.drop(columns='paths', errors='ignore').reset_index(drop=True)
+        paths = PathArray(offsets=np.zeros(1, dtype=np.int64), values=np.zeros(0, dtype=np.int32),
+                          ids=pd.Index([], dtype=object))
+        return CompactHierarchy(frame=frame, paths=paths, columns=columns)
+    df = df_hierarchy.reset_index(drop=True)
+    _, _, flat_path_ids = flatten_paths(df['paths'].to_numpy())
+
+    id_columns = [c for c in ID_COLUMNS if c in df.columns]
+    ids = _dictionary(np.concatenate([df[c].to_numpy(dtype=object) for c in id_columns] + [flat_path_ids]))
+    name_columns = [c for c in df.columns if c in NAME_COLUMNS or c.startswith('level')]
+    names = _dictionary(np.concatenate([df[c].to_numpy(dtype=object) for c in name_columns])) if name_columns else None
+
+    id_dtype = pd.CategoricalDtype(ids)
+    name_dtype = pd.CategoricalDtype(names) if names is not None else None
+    frame = pd.DataFrame(index=df.index)
+    for column in columns:
+        if column == 'paths':
+            continue
+        if column in id_columns:
+            frame[column] = df[column].astype(object).astype(id_dtype)
+        elif column in name_columns:
+            frame[column] = df[column].astype(object).astype(name_dtype)
+        elif column == 'type':
+            frame[column] = pd.to_numeric(df[column], downcast='integer')
+        else:
+            frame[column] = df[column]
+    return CompactHierarchy(frame=frame, paths=PathArray.from_lists(df['paths'].to_numpy(), ids), columns=columns)
+
+
+def compact_listname(df_listname: pd.DataFrame) -> pd.DataFrame:
+    """Categorical names and empty criticality / equipment_type columns; MACs stay plain."""
+    df = df_listname.copy()
+    for column in ('name', 'criticality', 'equipment_type'):
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    return df
+
+
+def frame_memory(df) -> int:
+    """Deep memory footprint in bytes of a DataFrame or CompactHierarchy."""
+    if isinstance(df, CompactHierarchy):
+        return df.memory_usage()["total"]
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,230 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import pandas as pd
+
+DEFAULT_CONCURRENCY = 16
+MAX_CONCURRENCY = 64
+DEFAULT_TIMEOUT = 60.0   # seconds per command
+MAX_OUTPUT = 64 * 1024   # characters of output kept per command
+POLL_INTERVAL = 0.2      # seconds between checks for cancellation while a command runs
+REPORT_INTERVAL = 0.5    # seconds between progress reports of a batch
+
+STATUSES = ("pending", "running", "ok", "failed", "timeout", "cancelled")
+
+
+class CommandTimeout(Exception):
+    """A command ran longer than its timeout and was killed."""
+
+
+class CommandCancelled(Exception):
+    """A command was killed because its batch was cancelled."""
+
+
+def _truncate(output: str) -> str:
+    if len(output) <= MAX_OUTPUT:
+        return output
+    return output[:MAX_OUTPUT] + f"\n... ({len(output) - MAX_OUTPUT} characters truncated)"
+
+
+# --- Runners ---
+# A runner executes one command: run(command, timeout, cancel) returns (returncode, output),
+# raises CommandTimeout / CommandCancelled, and must return promptly once `cancel` is set.
+
+class LocalRunner:
+    """Runs commands in a local shell."""
+
+    name = "local"
+
+    def _argv(self, command: str):
+        return command
+
+    def run(self, command: str, timeout: float, cancel: threading.Event):
+        argv = self._argv(command)
+        process = subprocess.Popen(
+            argv, shell=isinstance(argv, str),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            text=True, errors="replace",
+            # Own process group, so a timeout also kills what the shell started
+            start_new_session=True,
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                output, _ = process.communicate(timeout=POLL_INTERVAL)
+                return process.returncode, output
+            except subprocess.TimeoutExpired:
+                if cancel.is_set() or time.monotonic() >= deadline:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.communicate()
+                    if cancel.is_set():
+                        raise CommandCancelled()
+                    raise CommandTimeout(f"no result after {timeout:.0f}s")
+
+
+class SshRunner(LocalRunner):
+    """Runs commands on a remote host through the system ssh client (keys or agent, no password prompt)."""
+
+    name = "ssh"
+
+    def __init__(self, host: str, user: str = None, port: int = 22, connect_timeout: int = 10):
+        self.host = host
+        self.user = user
+        self.port = port
+        self.connect_timeout = connect_timeout
+
+    def _argv(self, command: str):
+        target = f"{self.user}@{self.host}" if self.user else self.host
+        return [
+            "ssh", "-o", "BatchMode=yes", "-o", f"ConnectTimeout={self.connect_timeout}",
+            "-p", str(self.port), target, command,
+        ]
+
+
+class StubRunner:
+    """Pretends to run commands (dry runs and tests): waits `delay` seconds and echoes the command."""
+
+    name = "stub"
+
+    def __init__(self, delay: float = 0.5, fail_every: int = 0):
+        self.delay = delay
+        self.fail_every = fail_every
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def run(self, command: str, timeout: float, cancel: threading.Event):
+        with self._lock:
+            self._count += 1
+            failing = self.fail_every and self._count % self.fail_every == 0
+        if cancel.wait(min(self.delay, timeout)):
+            raise CommandCancelled()
+        if self.delay > timeout:
+            raise CommandTimeout(f"no result after {timeout:.0f}s")
+        if failing:
+            return 1, f"[stub] {command}\nsimulated failure"
+        return 0, f"[stub] {command}"
+
+
+# --- Batches ---
+
+@dataclass
+class CommandResult:
+    """Status and output of one command of a batch."""
+    serial: str
+    mac: str
+    command: str
+    status: str = "pending"
+    returncode: int = None
+    output: str = ""
+    started_at: float = None
+    finished_at: float = None
+
+    @property
+    def duration(self):
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class BatchRun:
+    """
+    The commands of a campaign (DataFrame with serial, mac and command columns)
+    dispatched through a runner, at most `concurrency` at a time, each killed
+    after `timeout` seconds. Results are updated in place while run() works, so
+    another thread can display them; cancel() stops pending commands and kills
+    the running ones.
+    """
+
+    def __init__(self, commands: pd.DataFrame, runner, concurrency: int = DEFAULT_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.runner = runner
+        self.concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+        self.timeout = timeout
+        self.results = [
+            CommandResult(serial, mac, command)
+            for serial, mac, command in zip(commands["serial"], commands["mac"], commands["command"])
+        ]
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def counts(self) -> dict:
+        counts = dict.fromkeys(STATUSES, 0)
+        for result in self.results:
+            counts[result.status] += 1
+        return counts
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "serial": [r.serial for r in self.results],
+            "mac": [r.mac for r in self.results],
+            "status": [r.status for r in self.results],
+            "returncode": pd.array([r.returncode for r in self.results], dtype="Int64"),
+            "duration": [round(r.duration, 1) if r.duration is not None else None for r in self.results],
+            "command": [r.command for r in self.results],
+            "output": [r.output for r in self.results],
+            "finished_at": pd.to_datetime([r.finished_at for r in self.results], unit="s"),
+        })
+
+    def _execute(self, result: CommandResult):
+        if self.cancelled:
+            result.status = "cancelled"
+            return
+        result.started_at = time.time()
+        result.status = "running"
+        try:
+            returncode, output = self.runner.run(result.command, self.timeout, self._cancel)
+            result.returncode = returncode
+            result.output = _truncate(output)
+            result.status = "ok" if returncode == 0 else "failed"
+        except CommandTimeout as e:
+            result.status = "timeout"
+            result.output = str(e)
+        except CommandCancelled:
+            result.status = "cancelled"
+        except Exception as e:
+            result.status = "failed"
+            result.output = str(e)
+        finally:
+            result.finished_at = time.time()
+
+    def run(self, reporter=None):
+        """Runs every command (blocking). Returns self."""
+        self.started_at = time.time()
+        total = len(self.results)
+        done = 0
+        reported = 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="isee-batch") as pool:
+            futures = [pool.submit(self._execute, result) for result in self.results]
+            for future in as_completed(futures):
+                future.result()
+                done += 1
+                if reporter is not None and (time.monotonic() - reported >= REPORT_INTERVAL or done == total):
+                    reported = time.monotonic()
+                    counts = self.counts()
+                    reporter.progress(done / total,
+                                      f"{done}/{total} commands finished ({counts['ok']} ok, "
+                                      f"{counts['failed'] + counts['timeout']} failed)")
+        self.finished_at = time.time()
+        if reporter is not None:
+            counts = self.counts()
+            if counts["cancelled"]:
+                reporter.warning(f"Batch cancelled: {counts['cancelled']} commands were not run")
+            if counts["failed"] or counts["timeout"]:
+                reporter.warning(f"{counts['failed']} commands failed, {counts['timeout']} timed out")
+        return self
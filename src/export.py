@@ -0,0 +1,161 @@
+import gzip
+import os
+import re
+import shutil
+import time
+import pandas as pd
+from src.compact import CompactHierarchy
+from src.progress import logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only the Parquet export needs it
+    pa = pq = None
+
+_ARROW_ERRORS = (pa.ArrowException,) if pa is not None else ()
+
+EXPORT_DIR = os.path.join("data", "cache", "exports")
+CHUNK_ROWS = 50000
+MAX_EXPORT_AGE = 24 * 3600  # seconds; older artifacts (e.g. of closed sessions) are removed
+
+# Export format -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "csv.gz": ("csv.gz", "application/gzip"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_chunks(source, chunk_rows: int = CHUNK_ROWS):
+    """Yields plain DataFrame slices of a DataFrame or CompactHierarchy."""
+    total = len(source)
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        if isinstance(source, CompactHierarchy):
+            yield source.to_frame(start, stop)
+        else:
+            yield source.iloc[start:stop]
+
+
+def write_csv(source, path: str, compress: bool = False, chunk_rows: int = CHUNK_ROWS):
+    """Writes `source` as (optionally gzip-compressed) UTF-8 CSV, one chunk at a time."""
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        for index, chunk in enumerate(iter_chunks(source, chunk_rows)):
+            chunk.to_csv(f, index=False, header=index == 0)
+
+
+def _parquet_schema(source, chunk: pd.DataFrame):
+    """
+    Arrow schema of the whole source, from its first chunk. The name, level and id
+    columns of a CompactHierarchy (categoricals) are typed from their dictionary
+    rather than from the chunk, where an all-empty column comes back as float64;
+    columns empty in the first chunk (type "null") are typed as strings.
+    """
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    dtypes = source.frame.dtypes if isinstance(source, CompactHierarchy) else {}
+    for index, field in enumerate(schema):
+        dtype = dtypes.get(field.name)
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories.dtype
+            # String categories (object or pandas' StringDtype, e.g. combined databases) are strings
+            if pd.api.types.is_string_dtype(categories) or pd.api.types.is_object_dtype(categories):
+                arrow_type = pa.string()
+            else:
+                arrow_type = pa.from_numpy_dtype(categories)
+            schema = schema.set(index, pa.field(field.name, arrow_type))
+        elif pa.types.is_null(field.type):
+            schema = schema.set(index, pa.field(field.name, pa.string()))
+    return schema
+
+
+def _conform(chunk: pd.DataFrame, schema) -> pd.DataFrame:
+    """The chunk with all-empty (float64 NaN) columns of string fields turned into None objects."""
+    for field in schema:
+        if pa.types.is_string(field.type) and chunk[field.name].dtype != object and chunk[field.name].isna().all():
+            chunk = chunk.assign(**{field.name: pd.Series(None, index=chunk.index, dtype=object)})
+    return chunk
+
+
+def write_parquet(source, path: str, chunk_rows: int = CHUNK_ROWS):
+    """Writes `source` as Parquet, one row group per chunk."""
+    if pa is None:
+        raise ImportError("pyarrow is required for the Parquet export")
+
+    writer = None
+    schema = None
+    try:
+        for chunk in iter_chunks(source, chunk_rows):
+            if schema is None:
+                schema = _parquet_schema(source, chunk)
+                writer = pq.ParquetWriter(path, schema)
+            table = pa.Table.from_pandas(_conform(chunk, schema), schema=schema, preserve_index=False)
+            writer.write_table(table)
+        if writer is None:
+            # No rows (e.g. a database without assets): a file with the columns only
+            empty = source.to_frame() if isinstance(source, CompactHierarchy) else source
+            pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def build_exports(frames: dict, export_id: str, formats=tuple(EXPORT_FORMATS), root: str = EXPORT_DIR) -> dict:
+    """
+    Produces the download artifacts of one fetch, once.
+    `frames` maps a name (e.g. "hierarchy") to a DataFrame or CompactHierarchy.
+    Returns {name: {format: path}}; files live in <root>/<export_id>/, and the
+    previous artifacts of the same export_id are replaced.
+    """
+    prune_exports(root)
+    directory = os.path.join(root, re.sub(r'[^A-Za-z0-9_.-]', '_', export_id))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    artifacts = {}
+    for name, source in frames.items():
+        artifacts[name] = {}
+        for export_format in formats:
+            extension, _ = EXPORT_FORMATS[export_format]
+            path = os.path.join(directory, f"{name}.{extension}")
+            tmp_path = path + ".tmp"
+            try:
+                if export_format == "parquet":
+                    write_parquet(source, tmp_path)
+                else:
+                    write_csv(source, tmp_path, compress=export_format == "csv.gz")
+            except ImportError as e:
+                # pyarrow is optional for the CSV exports
+                logger.warning("%s export skipped: %s", export_format, e)
+                continue
+            except (OSError, *_ARROW_ERRORS) as e:
+                # One failed format (disk full, unexpected column types...) does not lose the others
+                logger.warning("%s export of %s failed: %s", export_format, name, e)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            os.replace(tmp_path, path)
+            artifacts[name][export_format] = path
+    return artifacts
+
+
+def prune_exports(root: str = EXPORT_DIR, max_age: float = MAX_EXPORT_AGE):
+    """Removes export directories older than max_age."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        if os.path.isdir(directory) and time.time() - os.path.getmtime(directory) > max_age:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def remove_exports(artifacts: dict):
+    """Deletes the files of a build_exports result (and their directory)."""
+    directories = {os.path.dirname(path) for paths in artifacts.values() for path in paths.values()}
+    for directory in directories:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def read_artifact(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,243 @@
+import time
+import numpy as np
+import pandas as pd
+from itertools import chain
+
+UNKNOWN_PATH = "Unknown Path ID"
+
+# Asset type code -> (id column, name column) of the ancestor extracted for every row
+ANCESTOR_COLUMNS = {
+    16777221: ('Factory_id', 'factory_name'),
+    33554432: ('Asset_id', 'asset_name'),
+    16777222: ('Zone_id', 'zone_name'),
+}
+# Values used when the ancestors cannot be extracted at all
+ANCESTOR_FALLBACKS = {
+    'Factory_id': ('nullFid', 'nullFn'),
+    'Asset_id': ('null_Aid', 'nullAn'),
+    'Zone_id': ('nullZid', 'nullZn'),
+}
+
+
+class AssetBuffer:
+    """
+    Columnar buffers holding the asset fields used to build the hierarchy.
+    Pages can be collected in any order; paths are only resolved once every
+    asset is known (see build_hierarchy).
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.paths = []
+        self.types = []
+        self.macs = []  # None for assets without a MAC / coordinator
+
+    @classmethod
+    def from_assets(cls, assets):
+        buffer = cls()
+        for asset in assets:
+            buffer.add(asset)
+        return buffer
+
+    def add(self, asset: dict):
+        optionals = asset.get('optionals', {})
+        if 'mac' in optionals:
+            mac = optionals['mac']
+        elif 'coordinators' in optionals:
+            mac = optionals['coordinators'][0].replace(':', '').lower()
+        else:
+            mac = None
+        self.ids.append(asset['_id'])
+        self.names.append(asset['name'])
+        self.paths.append(asset['path'])
+        self.types.append(asset['t'])
+        self.macs.append(mac)
+
+    def extend(self, other: "AssetBuffer"):
+        self.ids.extend(other.ids)
+        self.names.extend(other.names)
+        self.paths.extend(other.paths)
+        self.types.extend(other.types)
+        self.macs.extend(other.macs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def head(self, count: int) -> "AssetBuffer":
+        """Returns a new buffer holding the first `count` assets."""
+        buffer = AssetBuffer()
+        buffer.ids = self.ids[:count]
+        buffer.names = self.names[:count]
+        buffer.paths = self.paths[:count]
+        buffer.types = self.types[:count]
+        buffer.macs = self.macs[:count]
+        return buffer
+
+    def to_frame(self) -> pd.DataFrame:
+        """Raw columns, as stored on disk (see src/cache.py)."""
+        return pd.DataFrame({"_id": self.ids, "name": self.names, "path": self.paths, "t": self.types, "mac": self.macs})
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "AssetBuffer":
+        buffer = cls()
+        buffer.ids = df['_id'].tolist()
+        buffer.names = df['name'].tolist()
+        buffer.paths = [list(path) for path in df['path']]
+        buffer.types = df['t'].tolist()
+        buffer.macs = [None if pd.isna(mac) else mac for mac in df['mac']]
+        return buffer
+
+    def hierarchy_frame(self) -> pd.DataFrame:
+        """One row per asset with its raw path (list of ancestor ids)."""
+        return pd.DataFrame({"paths": self.paths, "name": self.names, "_id": self.ids, "type": self.types})
+
+    def listname_frame(self) -> pd.DataFrame:
+        """
+        One row per asset with its MAC, or empty criticality / equipment_type
+        columns for assets without one. Columns appear in the same order as when
+        the frame was built row by row.
+        """
+        has_mac = np.fromiter((mac is not None for mac in self.macs), dtype=bool, count=len(self.macs))
+        df = pd.DataFrame({"_id": self.ids, "name": self.names})
+        mac_columns = {}
+        if has_mac.any():
+            mac_columns["mac"] = pd.Series(self.macs).where(has_mac)
+        other_columns = {}
+        if not has_mac.all():
+            empty = pd.Series("", index=df.index).where(~has_mac)
+            other_columns = {"criticality": empty, "equipment_type": empty.copy()}
+        ordered = [other_columns, mac_columns] if len(has_mac) and not has_mac[0] else [mac_columns, other_columns]
+        for columns in ordered:
+            for name, values in columns.items():
+                df[name] = values
+        return df
+
+
+def flatten_paths(paths):
+    """
+    Flattens a sequence of paths into parallel arrays.
+    Returns (rows, depths, flat_ids): for every path element, the row it belongs
+    to, its 1-based depth in the path, and the ancestor id itself.
+    """
+    lengths = np.fromiter(map(len, paths), dtype=np.int64, count=len(paths))
+    total = int(lengths.sum())
+    flat_ids = np.fromiter(chain.from_iterable(paths), dtype=object, count=total)
+    rows = np.repeat(np.arange(len(paths)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    depths = np.arange(total) - starts + 1
+    return rows, depths, flat_ids
+
+
+def resolve_path_levels(df_hierarchy: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the levelN columns (name of the Nth ancestor in `paths`) in one
+    vectorized pass over an id -> name index built from every asset, so the
+    result does not depend on the order pages were received in.
+    """
+    df_hierarchy = df_hierarchy.reset_index(drop=True)
+    names = pd.Series(df_hierarchy['name'].to_numpy(), index=df_hierarchy['_id'].to_numpy())
+    names = names[~names.index.duplicated(keep='last')]
+
+    rows, depths, flat_ids = flatten_paths(df_hierarchy['paths'].to_numpy())
+    codes = names.index.get_indexer(flat_ids)
+    resolved = np.where(codes >= 0, names.to_numpy()[codes], UNKNOWN_PATH)
+
+    levels = {}
+    max_depth = int(depths.max()) if len(depths) else 0
+    for depth in range(1, max_depth + 1):
+        mask = depths == depth
+        column = np.full(len(df_hierarchy), np.nan, dtype=object)
+        column[rows[mask]] = resolved[mask]
+        levels[f"level{depth}"] = column
+    return pd.concat([df_hierarchy, pd.DataFrame(levels, index=df_hierarchy.index)], axis=1)
+
+
+def extract_ancestors(df_hierarchy: pd.DataFrame) -> pd.DataFrame:
+    """
+    Finds, for every row, its Factory / Asset / Zone ancestor in one pass: the
+    paths are flattened once and joined against a type-indexed id table.
+    When a path holds several ancestors of the same type, the greatest id wins
+    (the id columns hold 'noid' when there is none).
+    Returns a frame with the id and name columns of ANCESTOR_COLUMNS, aligned
+    on df_hierarchy's rows.
+    """
+    df_hierarchy = df_hierarchy.reset_index(drop=True)
+    typed = df_hierarchy[df_hierarchy['type'].isin(list(ANCESTOR_COLUMNS))]
+    typed = typed.drop_duplicates('_id')
+    # Sorting the typed ids once turns "greatest id" into an integer max over ranks
+    order = np.argsort(typed['_id'].to_numpy(dtype=object), kind='stable')
+    typed_ids = typed['_id'].to_numpy(dtype=object)[order]
+    typed_types = typed['type'].to_numpy()[order]
+    typed_names = pd.Series(typed['name'].to_numpy()[order], index=typed_ids)
+
+    rows, _, flat_ids = flatten_paths(df_hierarchy['paths'].to_numpy())
+    ranks = pd.Index(typed_ids).get_indexer(flat_ids)
+    hit = ranks >= 0
+    rows, ranks = rows[hit], ranks[hit]
+    rank_types = typed_types[ranks]
+
+    result = pd.DataFrame(index=df_hierarchy.index)
+    for type_code, (id_column, name_column) in ANCESTOR_COLUMNS.items():
+        best = np.full(len(df_hierarchy), -1, dtype=np.int64)
+        of_type = rank_types == type_code
+        np.maximum.at(best, rows[of_type], ranks[of_type])
+        ids = np.full(len(df_hierarchy), 'noid', dtype=object)
+        found = best >= 0
+        ids[found] = [str(value) for value in typed_ids[best[found]]]
+        result[id_column] = ids
+        result[name_column] = result[id_column].map(typed_names)
+    return result
+
+
+def build_hierarchy(buffer: AssetBuffer, timings: dict = None):
+    """
+    Builds the (hierarchy, listname) DataFrames from every collected asset.
+    When a `timings` dict is given, the duration in seconds of each stage
+    (path_resolution, ancestor_extraction, merge) is recorded in it.
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    df_hierarchy = resolve_path_levels(buffer.hierarchy_frame())
+    timings['path_resolution'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df_listname = buffer.listname_frame()
+
+    if 'level1' in df_hierarchy.columns:
+        df_hierarchy = df_hierarchy[df_hierarchy['level1'] != 'Recycle bin'].reset_index(drop=True)
+
+    # Make a copy to work with
+    df_processed = df_hierarchy.copy()
+    merge_time = time.perf_counter() - start
+
+    # ------------- Factory / Asset / Zone Extraction (single pass) -------------
+    start = time.perf_counter()
+    try:
+        ancestors = extract_ancestors(df_hierarchy)
+    except Exception as e:
+        print('no factory/asset/zone extracted ', e)
+        ancestors = None
+    timings['ancestor_extraction'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for type_code, (id_column, name_column) in ANCESTOR_COLUMNS.items():
+        if ancestors is None:
+            df_processed[id_column], df_processed[name_column] = ANCESTOR_FALLBACKS[id_column]
+            continue
+        print(name_column.replace('_name', ''), " ", int((df_hierarchy['type'] == type_code).sum()))
+        df_processed[id_column] = ancestors[id_column]
+        df_processed[name_column] = ancestors[name_column]
+
+    # --- Final Column Reordering ---
+    end_columns = [
+        'name', '_id', 'type',
+        'Factory_id', 'factory_name',
+        'Asset_id', 'asset_name',
+        'Zone_id', 'zone_name'
+    ]
+    front_columns = [col for col in df_processed.columns if col not in end_columns]
+    df_processed = df_processed[front_columns + end_columns]
+    timings['merge'] = merge_time + time.perf_counter() - start
+
+    return df_processed, df_listname
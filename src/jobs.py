@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from src.progress import StateReporter
+
+MAX_JOBS = 4          # fetches running at the same time in the process
+MAX_BATCH_JOBS = 4    # batch command runs at the same time, in a pool of their own
+JOB_RETENTION = 900   # seconds a finished job (and its result) stays available
+
+
+@dataclass
+class Job:
+    """A background operation, its progress and, once finished, its result."""
+    key: tuple
+    owners: set = field(default_factory=set)
+    status: str = "running"  # running, done, failed
+    fraction: float = 0.0
+    text: str = ""
+    messages: list = field(default_factory=list)  # (level, message)
+    result: object = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    @property
+    def errors(self) -> list:
+        return [message for level, message in self.messages if level == "error"]
+
+
+class JobManager:
+    """
+    Runs jobs in a shared thread pool, outside of any Streamlit script run, so
+    they survive reruns and interrupted scripts. Jobs are keyed: submitting a key
+    that is already running attaches to that job instead of starting a duplicate.
+    Callers keep the key and poll get(key) for progress and the result.
+    """
+
+    def __init__(self, max_workers: int = MAX_JOBS, retention: float = JOB_RETENTION, name: str = "job"):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"isee-{name}")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: tuple, target, owner=None, **kwargs):
+        """
+        Starts target(reporter=..., **kwargs) as job `key`, unless that key is
+        already running. Returns (job, attached): attached is True when joining
+        an in-flight job. Exceptions of `target` mark the job as failed.
+        """
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(key)
+            if job is not None and not job.finished:
+                job.owners.add(owner)
+                return job, True
+            job = Job(key=key, owners={owner})
+            self._jobs[key] = job
+        self._executor.submit(self._run, job, target, kwargs)
+        return job, False
+
+    def _run(self, job: Job, target, kwargs):
+        reporter = StateReporter(job)
+        try:
+            job.result = target(reporter=reporter, **kwargs)
+            job.fraction = 1.0
+            job.status = "done"
+        except Exception as e:
+            reporter.error(str(e))
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, key: tuple):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def running(self) -> list:
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.finished]
+
+    def _purge(self):
+        now = time.time()
+        for key, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.retention:
+                del self._jobs[key]
+
+
+# Pool name -> max jobs at the same time. Pools do not share threads, so long
+# batch command runs cannot hold the slots of hierarchy fetches (and vice versa)
+JOB_POOLS = {
+    "fetch": MAX_JOBS,
+    "batch": MAX_BATCH_JOBS,
+}
+
+_managers = {}
+_manager_lock = threading.Lock()
+
+
+def get_job_manager(pool: str = "fetch") -> JobManager:
+    """The process-wide JobManager of `pool` (see JOB_POOLS), shared by every Streamlit session."""
+    with _manager_lock:
+        manager = _managers.get(pool)
+        if manager is None:
+            manager = _managers[pool] = JobManager(max_workers=JOB_POOLS[pool], name=pool)
+        return manager
+
+
+def fetch_job_key(api) -> tuple:
+    return ("hierarchy", api.server, api.database)
+
+
+def run_hierarchy_fetch(api, reporter, **options):
+    """
+    Job target: fetches the hierarchy of api's current database with a client of
+    its own (Api.for_database), so the session can keep using or switching `api`
+    meanwhile. Returns (df_hierarchy, df_listname, telemetry).
+    """
+    client = api.for_database(api.database)
+    if isinstance(client, str):
+        raise RuntimeError(client)
+    df_hierarchy, df_listname = client.get_hierarchy(reporter=reporter, **options)
+    if df_hierarchy is None or df_listname is None:
+        raise RuntimeError("Failed to fetch hierarchy data.")
+    return df_hierarchy, df_listname, client.telemetry
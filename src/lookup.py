@@ -0,0 +1,68 @@
+import threading
+from collections.abc import Mapping
+import pandas as pd
+from src.lookup_index import GatewayIndex
+
+LOOKUP_COLUMNS = ('serial_number', 'mac_address')
+
+
+def normalize_macs(values) -> pd.Series:
+    """MAC addresses as lowercase hex without separators ('E1:26:01:85:DD:89' -> 'e1260185dd89')."""
+    macs = pd.Series(values, dtype="string").str.strip()
+    return macs.str.replace(r'[^0-9A-Fa-f]', '', regex=True).str.lower()
+
+
+class LookupTable(Mapping):
+    """
+    Read-only gateway serial number -> MAC address mapping. One instance is
+    shared by every session reading the same file, so it must not be modified:
+    build a new table instead (from_frame / read_lookup_csv).
+    `frame` holds the serial_number and mac_address columns, MACs normalised.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self._macs = dict(zip(frame['serial_number'], frame['mac_address']))
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "LookupTable":
+        """Strips serials, normalises MACs and drops empty serials; the last row of a duplicated serial wins."""
+        missing = [c for c in LOOKUP_COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError("The CSV file must contain the columns 'serial_number' and 'mac_address'")
+        frame = pd.DataFrame({
+            'serial_number': pd.Series(df['serial_number'], dtype="string").str.strip(),
+            'mac_address': normalize_macs(df['mac_address']),
+        })
+        frame = frame[frame['serial_number'].fillna('') != '']
+        frame = frame.drop_duplicates('serial_number', keep='last').reset_index(drop=True)
+        return cls(frame)
+
+    def __getitem__(self, serial):
+        return self._macs[serial]
+
+    def __iter__(self):
+        return iter(self._macs)
+
+    def __len__(self):
+        return len(self._macs)
+
+    def lookup(self, serials) -> pd.Series:
+        """MAC of each serial (in order), <NA> for unknown serials."""
+        return pd.Series(serials, dtype="string").map(self._macs).astype("string")
+
+    def index(self) -> GatewayIndex:
+        """Serial <-> MAC index with nearest-match suggestions, built once per table."""
+        with self._index_lock:
+            if self._index is None:
+                self._index = GatewayIndex(self.frame)
+            return self._index
+
+
+def read_lookup_csv(source) -> LookupTable:
+    """Reads a serial_number,mac_address CSV (path or file-like); serials are kept as text."""
+    df = pd.read_csv(source, dtype=str, keep_default_na=False, skipinitialspace=True)
+    return LookupTable.from_frame(df)
+
@@ -0,0 +1,150 @@
+import difflib
+import os
+import re
+from collections import Counter, defaultdict
+import numpy as np
+import pandas as pd
+
+NGRAM = 3
+MAX_CANDIDATES = 20     # best trigram overlaps re-ranked by similarity ratio
+MIN_SIMILARITY = 0.6    # suggestions below this ratio are dropped
+MAC_LENGTH = 12         # hex digits of a MAC address without separators
+
+_NOT_HEX = re.compile(r'[^0-9a-f]')
+_MAC_LIKE = re.compile(r'[0-9a-fA-F:.\-]+')
+
+
+def _ngrams(text: str) -> set:
+    padded = f"^{text}$"
+    return {padded[i:i + NGRAM] for i in range(max(1, len(padded) - NGRAM + 1))}
+
+
+def _deletions(text: str) -> set:
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+class NearestIndex:
+    """
+    Nearest-match search over a list of keys:
+    - keys one edit away (a character added, dropped, replaced or two swapped)
+      are found through an index of single-character deletions,
+    - otherwise an inverted index of character trigrams gives candidates,
+      re-ranked by similarity ratio.
+    """
+
+    def __init__(self, keys):
+        self.keys = list(keys)
+        deletions = defaultdict(list)
+        postings = defaultdict(list)
+        for key_id, key in enumerate(self.keys):
+            for variant in _deletions(key):
+                deletions[variant].append(key_id)
+            for gram in _ngrams(key):
+                postings[gram].append(key_id)
+        self._deletions = dict(deletions)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _ranked(self, query: str, candidates, limit: int) -> list:
+        scored = []
+        for key_id in candidates:
+            ratio = difflib.SequenceMatcher(None, query, self.keys[key_id]).ratio()
+            if ratio >= MIN_SIMILARITY:
+                scored.append((key_id, ratio, len(os.path.commonprefix([query, self.keys[key_id]]))))
+        # Equally similar keys: the one sharing the longest prefix first (typos are mostly at the end)
+        scored.sort(key=lambda item: (-item[1], -item[2]))
+        return [(key_id, ratio) for key_id, ratio, _ in scored[:limit]]
+
+    def search(self, query: str, limit: int = 3) -> list:
+        """[(key id, similarity ratio)] of the keys closest to `query`, best first."""
+        if not query or not self.keys:
+            return []
+        # Keys sharing the most deletion variants with the query are the closest
+        close = Counter(key_id for variant in _deletions(query) for key_id in self._deletions.get(variant, ()))
+        if close:
+            return self._ranked(query, [key_id for key_id, _ in close.most_common(MAX_CANDIDATES)], limit)
+        lists = [self._postings[g] for g in _ngrams(query) if g in self._postings]
+        if not lists:
+            return []
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+        top = min(MAX_CANDIDATES, int(np.count_nonzero(counts)))
+        return self._ranked(query, np.argpartition(counts, -top)[-top:].tolist(), limit)
+
+
+class GatewayIndex:
+    """
+    Serial number <-> MAC address index of a lookup table frame
+    (serial_number, mac_address with normalised MACs):
+    - resolve() matches entries that are serials (exact, then case-insensitive)
+      or MAC addresses in any format (colons, dashes, case),
+    - suggest() proposes the nearest serials or MACs of an unresolved entry
+      (NearestIndex, built on first use).
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.serials = frame['serial_number'].astype(object).tolist()
+        self.macs = frame['mac_address'].astype(object).tolist()
+        rows = range(len(self.serials))
+        self._by_serial = dict(zip(self.serials, rows))
+        self._by_upper = {serial.upper(): row for serial, row in zip(self.serials, rows)}
+        self._by_mac = {mac: row for mac, row in zip(self.macs, rows) if isinstance(mac, str) and mac}
+        self._serial_grams = None
+        self._mac_grams = None
+
+    def resolve(self, entries) -> pd.DataFrame:
+        """
+        One row per entry: input, serial, mac and match ('serial', 'serial (case)'
+        or 'mac'); serial, mac and match are <NA> for unresolved entries.
+        """
+        inputs = pd.Series(entries, dtype="string").str.strip()
+        rows = inputs.map(self._by_serial)
+        match = pd.Series(pd.NA, index=inputs.index, dtype="string")
+        match[rows.notna()] = "serial"
+
+        todo = rows.isna()
+        if todo.any():
+            case_rows = inputs[todo].str.upper().map(self._by_upper)
+            rows[todo] = case_rows
+            match[case_rows.index[case_rows.notna()]] = "serial (case)"
+
+        todo = rows.isna()
+        if todo.any():
+            hexes = inputs[todo].str.lower().str.replace(_NOT_HEX, '', regex=True)
+            mac_rows = hexes.where(hexes.str.len() == MAC_LENGTH).map(self._by_mac)
+            rows[todo] = mac_rows
+            match[mac_rows.index[mac_rows.notna()]] = "mac"
+
+        found = rows.notna()
+        positions = rows[found].astype(int).to_numpy()
+        serial = pd.Series(pd.NA, index=inputs.index, dtype="string")
+        mac = pd.Series(pd.NA, index=inputs.index, dtype="string")
+        serial[found] = np.asarray(self.serials, dtype=object)[positions]
+        mac[found] = np.asarray(self.macs, dtype=object)[positions]
+        return pd.DataFrame({'input': inputs, 'serial': serial, 'mac': mac, 'match': match})
+
+    def serials_of_macs(self, macs) -> pd.Series:
+        """Serial of each normalised MAC (in order), <NA> for MACs of no known gateway."""
+        rows = pd.Series(macs, dtype="string").map(self._by_mac)
+        serials = pd.Series(pd.NA, index=rows.index, dtype="string")
+        found = rows.notna()
+        serials[found] = np.asarray(self.serials, dtype=object)[rows[found].astype(int).to_numpy()]
+        return serials
+
+    def suggest(self, entry: str, limit: int = 3) -> list:
+        """[(serial, mac, similarity)] of the gateways closest to `entry` by serial or MAC, best first."""
+        if self._serial_grams is None:
+            self._serial_grams = NearestIndex(serial.upper() for serial in self.serials)
+            self._mac_grams = NearestIndex(mac if isinstance(mac, str) else "" for mac in self.macs)
+        entry = entry.strip()
+        best = {}
+        for row, ratio in self._serial_grams.search(entry.upper(), limit):
+            best[row] = max(ratio, best.get(row, 0.0))
+        hexes = _NOT_HEX.sub('', entry.lower())
+        if _MAC_LIKE.fullmatch(entry) and len(hexes) >= MAC_LENGTH // 2:
+            for row, ratio in self._mac_grams.search(hexes, limit):
+                best[row] = max(ratio, best.get(row, 0.0))
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:limit]
+        return [(self.serials[row], self.macs[row], round(ratio, 2)) for row, ratio in ranked]
+
+    def suggest_many(self, entries, limit: int = 3) -> dict:
+        """{entry: suggestions} for distinct entries."""
+        return {entry: self.suggest(entry, limit) for entry in dict.fromkeys(entries)}
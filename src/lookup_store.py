@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import pandas as pd
+from src.lookup import LookupTable, read_lookup_csv
+
+BUSY_TIMEOUT = 10.0  # seconds a writer waits for another one before failing
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gateways (
+    serial_number TEXT PRIMARY KEY,
+    mac_address TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS gateways_mac ON gateways (mac_address);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+"""
+
+# Rows of the temp table `incoming` not already in gateways with the same MAC
+_UPSERT = """
+INSERT INTO gateways (serial_number, mac_address, updated_at)
+SELECT serial_number, mac_address, ? FROM incoming WHERE true
+ON CONFLICT (serial_number) DO UPDATE
+SET mac_address = excluded.mac_address, updated_at = excluded.updated_at
+WHERE gateways.mac_address IS NOT excluded.mac_address
+"""
+
+
+class LookupStore:
+    """
+    Gateway serial number -> MAC address table in a SQLite database (WAL mode),
+    shared by every session and process using the same file:
+    - readers never block and are not blocked by a writer,
+    - each write (upsert, replace, import_csv, save_changes) is one transaction:
+      concurrent saves are serialised instead of overwriting each other's file,
+      and only rows whose MAC changed are written,
+    - lookup() resolves any number of serials with one query on the primary key.
+    Connections are per thread; a revision counter, bumped by every write that
+    changes rows, lets table() reuse its LookupTable until the data changes.
+    The modification time of the last imported CSV file is kept with the data,
+    so sync_csv() imports a file again only after it changed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._table = None  # (revision, LookupTable)
+        self._table_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE in _write)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Reads ---
+
+    @property
+    def revision(self) -> int:
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    @property
+    def csv_mtime(self) -> int:
+        """Modification time (ns) of the last CSV file imported from a path, 0 if none."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'csv_mtime'").fetchone()
+        return row[0] if row else 0
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM gateways").fetchone()[0]
+
+    def lookup(self, serials) -> pd.Series:
+        """MAC of each serial (in order), <NA> for unknown serials."""
+        serials = pd.Series(serials, dtype="string")
+        wanted = json.dumps(serials.dropna().unique().tolist())
+        rows = self._conn().execute(
+            "SELECT g.serial_number, g.mac_address FROM json_each(?) AS j "
+            "JOIN gateways AS g ON g.serial_number = j.value",
+            (wanted,),
+        )
+        return serials.map(dict(rows)).astype("string")
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.read_sql_query(
+            "SELECT serial_number, mac_address FROM gateways ORDER BY serial_number", self._conn()
+        )
+        return df.astype("string")
+
+    def table(self) -> LookupTable:
+        """The whole store as a read-only LookupTable, read again only after a write."""
+        revision = self.revision
+        with self._table_lock:
+            if self._table is not None and self._table[0] == revision:
+                return self._table[1]
+        table = LookupTable(self.to_frame())
+        with self._table_lock:
+            self._table = (revision, table)
+        return table
+
+    def index(self):
+        """GatewayIndex of the current table (see LookupTable.index)."""
+        return self.table().index()
+
+    def export_csv(self, path: str):
+        """Writes the store in the serial_number,mac_address CSV format, replacing `path` atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".gateway_lookup-", suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                self.to_frame().to_csv(f, index=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    # --- Writes ---
+
+    def _write(self, rows, delete_missing: bool, removed=(), csv_mtime: int = None) -> int:
+        if isinstance(rows, LookupTable):
+            frame = rows.frame
+        else:
+            frame = LookupTable.from_frame(rows).frame
+        records = list(zip(frame['serial_number'].tolist(), frame['mac_address'].fillna('').tolist()))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS incoming "
+                "(serial_number TEXT PRIMARY KEY, mac_address TEXT NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("DELETE FROM incoming")
+            conn.executemany("INSERT INTO incoming (serial_number, mac_address) VALUES (?, ?)", records)
+            changed = 0
+            if delete_missing:
+                changed += conn.execute(
+                    "DELETE FROM gateways WHERE serial_number NOT IN (SELECT serial_number FROM incoming)"
+                ).rowcount
+            changed += conn.execute(_UPSERT, (time.time(),)).rowcount
+            if removed:
+                changed += conn.executemany(
+                    "DELETE FROM gateways WHERE serial_number = ?", [(serial,) for serial in removed]
+                ).rowcount
+            conn.execute("DELETE FROM incoming")
+            if changed:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            if csv_mtime is not None:
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('csv_mtime', ?) "
+                    "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                    (csv_mtime,),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def upsert(self, rows) -> int:
+        """
+        Adds or updates the rows of a LookupTable or serial_number/mac_address
+        DataFrame; rows already stored with the same MAC are left untouched.
+        Returns the number of rows written.
+        """
+        return self._write(rows, delete_missing=False)
+
+    def replace(self, rows) -> int:
+        """Makes the store hold exactly `rows`: upserts them and deletes the other serials, in one transaction."""
+        return self._write(rows, delete_missing=True)
+
+    def save_changes(self, table: LookupTable, base: LookupTable, removed=()) -> int:
+        """
+        Saves the edits of `table`, made from `base` (the table() of the store when
+        the session started editing): rows added or whose MAC differs from `base`
+        are upserted and the serials of `removed` deleted. Rows the session did not
+        touch, including those written meanwhile by other sessions, are kept.
+        Returns the number of rows written.
+        """
+        frame = table.frame
+        edited = base.lookup(frame['serial_number']).ne(frame['mac_address']).fillna(True).to_numpy()
+        return self._write(LookupTable(frame[edited].reset_index(drop=True)), delete_missing=False,
+                           removed=list(removed))
+
+    def import_csv(self, source, replace: bool = False) -> int:
+        """
+        Upserts (or with replace=True, replaces the store with) a serial_number,mac_address
+        CSV; the modification time of a file given by path is recorded (see sync_csv).
+        """
+        csv_mtime = os.stat(source).st_mtime_ns if isinstance(source, (str, os.PathLike)) else None
+        return self._write(read_lookup_csv(source), delete_missing=replace, csv_mtime=csv_mtime)
+
+    def sync_csv(self, path: str):
+        """
+        Imports (upserts) the CSV at `path` when it was modified since the last import.
+        Returns the number of rows written, None when the file is missing or unchanged.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime <= self.csv_mtime:
+            return None
+        return self.import_csv(path)
@@ -0,0 +1,131 @@
+# Parsers of lwsalt command outputs. Their format is not specified anywhere, so values are found
+# by pattern (numbers followed by dBm or after an "rssi" label, dotted version numbers after a
+# version/firmware key, MAC-like and hexadecimal ids, key/value lines) rather than by position;
+# unknown lines are skipped.
+import re
+import pandas as pd
+
+_COMMAND = re.compile(r"\blwsalt\s+(\w+)")
+_MAC = re.compile(r"\b(?:[0-9A-Fa-f]{2}[:-]){5}[0-9A-Fa-f]{2}\b|\b[0-9A-Fa-f]{12}\b")
+_RSSI = re.compile(r"rssi\D{0,5}?(-?\d+(?:\.\d+)?)|(-\d+(?:\.\d+)?)\s*dBm", re.IGNORECASE)
+# Noise floor readings are dBm values too, but not signal strengths
+_NOISE = re.compile(r"noise(?:[\s_-]*floor)?\D{0,5}?-?\d+(?:\.\d+)?(?:\s*dBm)?", re.IGNORECASE)
+# A line holding only a version number, and "<component> version/firmware/fw: <version>" lines
+_VERSION = re.compile(r"^\s*v?(\d+(?:\.\d+){1,3}(?:[-+][\w.]+)?)\s*$", re.MULTILINE)
+_VERSION_LINE = re.compile(r"^\s*([\w .-]*?)[\s_-]*(?<![a-z])(?:version|firmware|fw)\s*[:=]\s*"
+                           r"v?(\d+(?:\.\d+){1,3}(?:[-+][\w.]+)?)", re.IGNORECASE)
+_KEY_VALUE = re.compile(r"^\s*([A-Za-z_][\w .-]*?)\s*[:=]\s*(.*?)\s*$")
+_SENSOR_ID = re.compile(r"\b(?:[0-9A-Fa-f]{2}[:-]){3,7}[0-9A-Fa-f]{2}\b|\b[0-9A-Fa-f]{8,16}\b")
+_NETWORK = re.compile(r"\b(wifi|wi-fi|ethernet|eth\d*|lte|4g|3g|mesh|zigbee|lora\w*)\b", re.IGNORECASE)
+
+
+def command_kind(command: str):
+    """The lwsalt sub-command of a command line ('rssi', 'version'...), None for other commands."""
+    match = _COMMAND.search(command or "")
+    return match.group(1).lower() if match else None
+
+
+def normalize_id(text: str) -> str:
+    return re.sub(r"[^0-9a-f]", "", text.lower())
+
+
+def _rssi(line: str):
+    match = _RSSI.search(_NOISE.sub("", line))
+    if match is None:
+        return None
+    return float(match.group(1) or match.group(2))
+
+
+def parse_rssi(output: str) -> list:
+    """[{'rssi'}] for every RSSI value found."""
+    return [{"rssi": value} for value in (_rssi(line) for line in output.splitlines()) if value is not None]
+
+
+def parse_version(output: str) -> list:
+    """[{'component', 'version'}]: 'name version: 1.2.3' lines, else the first line that is only a version number."""
+    records = []
+    for line in output.splitlines():
+        match = _VERSION_LINE.match(line)
+        if match:
+            records.append({"component": match.group(1).strip().lower() or "firmware", "version": match.group(2)})
+    if not records:
+        match = _VERSION.search(output)
+        if match:
+            records.append({"component": "firmware", "version": match.group(1)})
+    return records
+
+
+def parse_neighbors(output: str) -> list:
+    """[{'neighbor_mac', 'rssi', 'network'}] for every line holding a MAC address."""
+    records = []
+    for line in output.splitlines():
+        match = _MAC.search(line)
+        if match is None:
+            continue
+        network = _NETWORK.search(line)
+        records.append({
+            "neighbor_mac": normalize_id(match.group(0)),
+            "rssi": _rssi(line),
+            "network": network.group(1).lower() if network else None,
+        })
+    return records
+
+
+def parse_settings(output: str) -> list:
+    """[{'key', 'value'}] for every 'key: value' or 'key = value' line."""
+    records = []
+    for line in output.splitlines():
+        match = _KEY_VALUE.match(line)
+        if match and match.group(2):
+            records.append({"key": match.group(1).strip().lower(), "value": match.group(2)})
+    return records
+
+
+def parse_sensors(output: str) -> list:
+    """[{'sensor_id', 'rssi'}] for every line holding a hexadecimal sensor id."""
+    records = []
+    for line in output.splitlines():
+        match = _SENSOR_ID.search(line)
+        if match:
+            records.append({"sensor_id": normalize_id(match.group(0)), "rssi": _rssi(line)})
+    return records
+
+
+# lwsalt sub-command -> (parser, columns with their dtypes)
+PARSERS = {
+    "rssi": (parse_rssi, {"rssi": "float64"}),
+    "version": (parse_version, {"component": "string", "version": "string"}),
+    "neighbors": (parse_neighbors, {"neighbor_mac": "string", "rssi": "float64", "network": "string"}),
+    "settings": (parse_settings, {"key": "string", "value": "string"}),
+    "sensors": (parse_sensors, {"sensor_id": "string", "rssi": "float64"}),
+}
+
+
+def parse_results(results: pd.DataFrame) -> dict:
+    """
+    Typed records of the successful commands of a batch (BatchRun.frame(): serial,
+    mac, status, command, output, finished_at), as {kind: DataFrame} with the
+    columns serial, mac, collected_at and the kind's own columns.
+    """
+    ok = results[results["status"] == "ok"]
+    rows = {kind: [] for kind in PARSERS}
+    for serial, mac, command, output, finished_at in zip(
+        ok["serial"], ok["mac"], ok["command"], ok["output"], ok["finished_at"]
+    ):
+        kind = command_kind(command)
+        if kind not in PARSERS:
+            continue
+        parser, _ = PARSERS[kind]
+        for record in parser(output or ""):
+            rows[kind].append({"serial": serial, "mac": mac, "collected_at": finished_at, **record})
+
+    frames = {}
+    for kind, records in rows.items():
+        if not records:
+            continue
+        _, columns = PARSERS[kind]
+        frame = pd.DataFrame.from_records(records)
+        frame["collected_at"] = pd.to_datetime(frame["collected_at"])
+        frame = frame.astype({"serial": "string", "mac": "string", **columns})
+        frames[kind] = frame[["serial", "mac", "collected_at", *columns]]
+    return frames
@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import pandas as pd
+from src.compact import compact_hierarchy, compact_listname
+from src.progress import StateReporter
+
+MAX_DATABASES = 4  # databases fetched at the same time; each one also runs its own page workers
+
+
+@dataclass
+class DatabaseFetch:
+    """State and result of the hierarchy fetch of one database."""
+    name: str
+    db: str
+    status: str = "pending"  # pending, running, done, partial (a page failed), failed
+    fraction: float = 0.0
+    text: str = ""
+    messages: list = field(default_factory=list)  # (level, message)
+    df_hierarchy: pd.DataFrame = None
+    df_listname: pd.DataFrame = None
+    telemetry: object = None
+    seconds: float = 0.0
+
+    @property
+    def errors(self) -> list:
+        return [message for level, message in self.messages if level == "error"]
+
+
+def _fetch_database(api, fetch: DatabaseFetch, workers: int, cache, refresh: str, resume: bool,
+                    adaptive: bool = False, max_rate: float = None):
+    """Fetches one database. Every failure is recorded on `fetch`, never raised."""
+    reporter = StateReporter(fetch)
+    fetch.status = "running"
+    start = time.perf_counter()
+    try:
+        client = api.for_database(fetch.db)
+        if isinstance(client, str):
+            reporter.error(client)
+            fetch.status = "failed"
+            return fetch
+        df_hierarchy, df_listname = client.get_hierarchy(
+            workers=workers, cache=cache, refresh=refresh, resume=resume, reporter=reporter,
+            adaptive=adaptive, max_rate=max_rate,
+        )
+        fetch.telemetry = client.telemetry
+        if df_hierarchy is None or df_listname is None:
+            fetch.status = "failed"
+        else:
+            fetch.df_hierarchy, fetch.df_listname = df_hierarchy, df_listname
+            fetch.fraction = 1.0
+            fetch.status = "partial" if fetch.errors else "done"
+    except Exception as e:
+        reporter.error(f"Unexpected error: {e}")
+        fetch.status = "failed"
+    finally:
+        fetch.seconds = time.perf_counter() - start
+    return fetch
+
+
+def fetch_databases(api, dbs, workers: int = 4, max_databases: int = MAX_DATABASES, cache=None,
+                    refresh: str = "auto", resume: bool = True, adaptive: bool = False, max_rate: float = None,
+                    on_update=None, poll_interval: float = 0.5):
+    """
+    Fetches the hierarchies of several databases concurrently. `api` must have
+    completed login_step1_get_dbs; each database gets its own token (Api.for_database)
+    and at most `max_databases` are fetched at a time, each with `workers` page requests.
+    A database that fails does not stop the others. adaptive and max_rate are
+    passed to each Api.get_hierarchy.
+
+    on_update(fetches) is called from the calling thread every `poll_interval`
+    seconds and once at the end, e.g. to render per-database progress.
+    Returns the list of DatabaseFetch, in the order of `dbs`.
+    """
+    fetches = [DatabaseFetch(name=db['name'], db=db['db']) for db in dbs]
+    if not fetches:
+        return fetches
+    with ThreadPoolExecutor(max_workers=max(1, min(max_databases, len(fetches)))) as executor:
+        pending = {executor.submit(_fetch_database, api, fetch, workers, cache, refresh, resume, adaptive, max_rate)
+                   for fetch in fetches}
+        while pending:
+            _, pending = wait(pending, timeout=poll_interval)
+            if on_update is not None:
+                on_update(fetches)
+    return fetches
+
+
+def combine_hierarchies(fetches, compact: bool = False):
+    """
+    Concatenates the results of the successful fetches into one hierarchy and one
+    listname frame, each with a leading `database` column. Databases of different
+    depths are aligned on their levelN columns. Returns (None, None) if none succeeded.
+    """
+    results = [fetch for fetch in fetches if fetch.df_hierarchy is not None and len(fetch.df_hierarchy)]
+    if not results:
+        return None, None
+    frames = {}
+    for kind in ('df_hierarchy', 'df_listname'):
+        parts = [getattr(fetch, kind).assign(database=fetch.name) for fetch in results]
+        df = pd.concat(parts, ignore_index=True, sort=False)
+        levels = sorted((c for c in df.columns if c.startswith('level')), key=lambda c: int(c[5:]))
+        others = [c for c in df.columns if c != 'database' and c not in levels]
+        if levels and 'paths' in others:
+            position = others.index('paths') + 1
+            others = others[:position] + levels + others[position:]
+        else:
+            others += levels
+        frames[kind] = df[['database'] + others]
+    df_hierarchy, df_listname = frames['df_hierarchy'], frames['df_listname']
+    if compact:
+        df_hierarchy, df_listname = compact_hierarchy(df_hierarchy), compact_listname(df_listname)
+        df_hierarchy.frame['database'] = df_hierarchy.frame['database'].astype('category')
+        df_listname['database'] = df_listname['database'].astype('category')
+    return df_hierarchy, df_listname
@@ -0,0 +1,114 @@
+import logging
+import os
+from contextlib import contextmanager
+
+LOG_LEVEL = os.environ.get("ISEE_LOG_LEVEL", "INFO")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(message)s"
+
+logger = logging.getLogger("isee")
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """
+    Gives the `isee` logger (and its children, e.g. isee.telemetry) its own level
+    and stderr handler, so its records are written whatever the root logger is
+    set to (Streamlit leaves it at WARNING). The handler is only added once.
+    """
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+
+configure_logging()
+
+
+class ProgressReporter:
+    """
+    Receives the progress events of long-running operations (hierarchy fetches).
+    The engine only talks to this interface, so it runs the same with a
+    Streamlit UI (src/st_progress.py), a logger or nothing at all.
+    This base class ignores every event.
+    """
+
+    def progress(self, fraction: float, text: str = ""):
+        """Overall completion, between 0 and 1."""
+
+    def info(self, message: str):
+        pass
+
+    def warning(self, message: str):
+        pass
+
+    def error(self, message: str):
+        pass
+
+    @contextmanager
+    def stage(self, text: str):
+        """Wraps a named processing stage (fetching, processing...)."""
+        yield
+
+    def done(self):
+        """Called when the operation finished, successfully or not."""
+
+
+class LoggingReporter(ProgressReporter):
+    """Writes events to the `isee` logger; used by the command-line entry point."""
+
+    def __init__(self, prefix: str = "", step: float = 0.1):
+        self.prefix = f"[{prefix}] " if prefix else ""
+        self.step = step
+        self.errors = 0
+        self._next_report = 0.0
+
+    def progress(self, fraction: float, text: str = ""):
+        # Only log every `step` of progress to keep batch logs readable
+        if fraction >= self._next_report or fraction >= 1.0:
+            logger.info("%s%3.0f%% %s", self.prefix, fraction * 100, text)
+            self._next_report = fraction + self.step
+
+    def info(self, message: str):
+        logger.info("%s%s", self.prefix, message)
+
+    def warning(self, message: str):
+        logger.warning("%s%s", self.prefix, message)
+
+    def error(self, message: str):
+        self.errors += 1
+        logger.error("%s%s", self.prefix, message)
+
+    @contextmanager
+    def stage(self, text: str):
+        logger.info("%s%s", self.prefix, text)
+        yield
+
+
+class StateReporter(ProgressReporter):
+    """
+    Records events into `state`, any object with `fraction`, `text` and `messages`
+    (a list of (level, message)) attributes. Used by fetches running in worker
+    threads, where nothing can be rendered: the UI thread reads the state instead.
+    """
+
+    def __init__(self, state):
+        self.state = state
+
+    def progress(self, fraction: float, text: str = ""):
+        self.state.fraction = min(max(fraction, 0.0), 1.0)
+        self.state.text = text
+
+    def info(self, message: str):
+        self.state.messages.append(("info", message))
+
+    def warning(self, message: str):
+        self.state.messages.append(("warning", message))
+
+    def error(self, message: str):
+        self.state.messages.append(("error", message))
+
+    @contextmanager
+    def stage(self, text: str):
+        self.state.text = text
+        yield
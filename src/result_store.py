@@ -0,0 +1,87 @@
+import datetime
+import glob
+import os
+import uuid
+import pandas as pd
+
+RESULTS_DIR = os.path.join("data", "results")
+
+
+class ResultStore:
+    """
+    Append-only columnar store of parsed lwsalt records (see src.lwsalt), one
+    Parquet file per append under <root>/<kind>/date=YYYY-MM-DD/, the date of
+    collected_at. Files are never rewritten: an append is atomic (written to a
+    temporary name, then renamed) and readers only see complete files. Queries
+    read the partitions of the requested dates and work on whole columns.
+    """
+
+    def __init__(self, root: str = RESULTS_DIR):
+        self.root = root
+
+    def kinds(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def append(self, kind: str, frame: pd.DataFrame) -> int:
+        """Stores the records of `frame` (with a collected_at column). Returns the number of files written."""
+        if frame.empty:
+            return 0
+        written = 0
+        batch = uuid.uuid4().hex
+        for day, part in frame.groupby(frame["collected_at"].dt.date):
+            directory = os.path.join(self.root, kind, f"date={day.isoformat()}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{batch}.parquet")
+            tmp_path = path + ".tmp"
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            written += 1
+        return written
+
+    def files(self, kind: str, start: datetime.date = None, end: datetime.date = None) -> list:
+        """Parquet files of `kind` for the dates start..end (inclusive, None = unbounded)."""
+        files = []
+        for directory in sorted(glob.glob(os.path.join(self.root, kind, "date=*"))):
+            day = datetime.date.fromisoformat(os.path.basename(directory)[len("date="):])
+            if (start is None or day >= start) and (end is None or day <= end):
+                files.extend(sorted(glob.glob(os.path.join(directory, "*.parquet"))))
+        return files
+
+    def read(self, kind: str, start: datetime.date = None, end: datetime.date = None, columns: list = None):
+        """Records of `kind` collected between start and end, as one DataFrame (empty if none)."""
+        frames = [pd.read_parquet(path, columns=columns) for path in self.files(kind, start, end)]
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def latest(self, kind: str, start: datetime.date = None, end: datetime.date = None, columns: list = None):
+        """Records of the last collection of each gateway (all records sharing its latest collected_at)."""
+        df = self.read(kind, start, end, columns)
+        if df.empty:
+            return df
+        last = df.groupby("serial")["collected_at"].transform("max")
+        return df[df["collected_at"] == last].reset_index(drop=True)
+
+
+# --- Fleet queries ---
+
+def low_rssi(store: ResultStore, threshold: float = -90.0, start: datetime.date = None) -> pd.DataFrame:
+    """Gateways whose latest RSSI reading (weakest value if several) is below `threshold`."""
+    df = store.latest("rssi", start=start)
+    if df.empty:
+        return df
+    weakest = df.groupby(["serial", "mac"], as_index=False).agg(rssi=("rssi", "min"), collected_at=("collected_at", "max"))
+    return weakest[weakest["rssi"] < threshold].sort_values("rssi").reset_index(drop=True)
+
+
+def version_distribution(store: ResultStore, component: str = None, start: datetime.date = None) -> pd.DataFrame:
+    """Number of gateways per (component, version), from the latest version report of each gateway."""
+    df = store.latest("version", start=start)
+    if df.empty:
+        return pd.DataFrame(columns=["component", "version", "gateways"])
+    if component is not None:
+        df = df[df["component"] == component]
+    counts = df.groupby(["component", "version"], as_index=False)["serial"].nunique()
+    return counts.rename(columns={"serial": "gateways"}).sort_values("gateways", ascending=False).reset_index(drop=True)
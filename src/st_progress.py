@@ -0,0 +1,36 @@
+import streamlit as st
+from contextlib import contextmanager
+from src.progress import ProgressReporter
+
+
+class StreamlitReporter(ProgressReporter):
+    """Renders engine progress events with st.progress, st.spinner and status messages."""
+
+    def __init__(self):
+        self._progress_bar = None
+
+    def progress(self, fraction: float, text: str = ""):
+        fraction = min(max(fraction, 0.0), 1.0)
+        if self._progress_bar is None:
+            self._progress_bar = st.progress(fraction, text=text)
+        else:
+            self._progress_bar.progress(fraction, text=text)
+
+    def info(self, message: str):
+        st.info(message)
+
+    def warning(self, message: str):
+        st.warning(message)
+
+    def error(self, message: str):
+        st.error(message)
+
+    @contextmanager
+    def stage(self, text: str):
+        with st.spinner(text):
+            yield
+
+    def done(self):
+        if self._progress_bar is not None:
+            self._progress_bar.empty()
+            self._progress_bar = None
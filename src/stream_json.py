@@ -0,0 +1,118 @@
+import codecs
+import json
+
+try:
+    import ijson
+except ImportError:  # optional, the raw_decode parser below is used instead
+    ijson = None
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _TextStream:
+    """Text decoded incrementally from byte chunks, consumed through a moving position."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Appends the next chunk (dropping consumed text). Returns False at the end of the stream."""
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            tail = self._utf8.decode(b"", final=True)
+        else:
+            tail = self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+        self.text = self.text[self.pos:] + tail
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character (consuming the whitespace), '' at the end of the stream."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at position {self.pos} of the JSON stream")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+                # A value ending exactly at the end of the text may be cut (e.g. a number)
+                if end < len(self.text) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.more()
+
+
+def _iter_raw_decode(chunks, key: str):
+    stream = _TextStream(chunks)
+    stream.expect("{")
+    while stream.peek() not in ("}", ""):
+        name = stream.value()
+        stream.expect(":")
+        if name != key:
+            stream.value()  # other members (_meta, _links...) are small: decode and drop them
+        else:
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    separator = stream.peek()
+                    stream.pos += 1
+                    if separator == "]":
+                        break
+                    if separator != ",":
+                        raise ValueError(f"unexpected {separator!r} in the {key} array")
+        if stream.peek() == ",":
+            stream.pos += 1
+
+
+def _iter_ijson(chunks, key: str):
+    items = ijson.sendable_list()
+    parser = ijson.items_coro(items, f"{key}.item", use_float=True)
+    try:
+        for chunk in chunks:
+            parser.send(chunk)
+            yield from items
+            del items[:]
+        parser.close()
+    except ijson.JSONError as e:
+        # Not a ValueError subclass: raised as one, like the raw_decode parser does
+        raise ValueError(f"invalid JSON stream: {e}") from e
+    yield from items
+
+
+def iter_array_items(chunks, key: str = "_embedded"):
+    """
+    Yields the elements of the top-level array member `key` of a JSON object
+    one at a time, from an iterable of byte chunks (e.g. response.iter_content()),
+    so only one element is decoded in memory at a time. Uses ijson when it is
+    installed, a json.JSONDecoder.raw_decode based parser otherwise.
+    Malformed or truncated JSON raises ValueError with either parser.
+    """
+    if ijson is not None:
+        return _iter_ijson(chunks, key)
+    return _iter_raw_decode(chunks, key)
@@ -0,0 +1,89 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+import pandas as pd
+from src.progress import logger
+
+# One JSON object per line, e.g. {"event": "request", "status": 200, "duration": 0.41, ...}
+# Child of the `isee` logger: same level and handler (see src.progress.configure_logging)
+telemetry_logger = logger.getChild("telemetry")
+
+
+@dataclass
+class RequestRecord:
+    url: str
+    status: object          # HTTP status code, or the exception name on network errors
+    duration: float         # seconds until the response body was received
+    decode_time: float      # seconds spent decoding the JSON payload
+    bytes_received: int     # decoded body size
+    wire_bytes: int         # Content-Length as sent (compressed size when gzip applies), -1 if unknown
+    started_at: float
+
+
+class FetchTelemetry:
+    """
+    Per-request and per-stage measurements of one hierarchy fetch. Safe to
+    record into from the concurrent page fetchers. Every record is also written
+    to the `isee.telemetry` logger as a structured (JSON) line.
+    """
+
+    def __init__(self, context: dict = None):
+        self.context = context or {}
+        self.requests = []
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def _log(self, event: str, **fields):
+        if telemetry_logger.isEnabledFor(logging.INFO):
+            telemetry_logger.info(json.dumps({"event": event, **self.context, **fields}, default=str))
+
+    def record_request(self, record: RequestRecord):
+        with self._lock:
+            self.requests.append(record)
+        self._log("request", **asdict(record))
+
+    def record_stage(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = seconds
+        self._log("stage", stage=name, seconds=seconds)
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def requests_frame(self) -> pd.DataFrame:
+        with self._lock:
+            records = [asdict(record) for record in self.requests]
+        return pd.DataFrame(records, columns=list(RequestRecord.__dataclass_fields__))
+
+    def stages_frame(self) -> pd.DataFrame:
+        with self._lock:
+            stages = dict(self.stages)
+        return pd.DataFrame({"stage": list(stages), "seconds": list(stages.values())})
+
+    def summary(self) -> dict:
+        df = self.requests_frame()
+        if df.empty:
+            return {"requests": 0}
+        ok = df[df['status'] == 200]
+        summary = {
+            "requests": len(df),
+            "errors": int((df['status'] != 200).sum()),
+            "bytes_received": int(df['bytes_received'].sum()),
+            "wire_bytes": int(df.loc[df['wire_bytes'] >= 0, 'wire_bytes'].sum()),
+            "latency_mean": float(ok['duration'].mean()) if len(ok) else None,
+            "latency_p95": float(ok['duration'].quantile(0.95)) if len(ok) else None,
+            "decode_time": float(df['decode_time'].sum()),
+        }
+        return summary
+
+    def log_summary(self):
+        """Writes the request summary and stage timings as one structured line."""
+        self._log("summary", **self.summary(), stages=dict(self.stages))
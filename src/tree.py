@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from src.compact import CompactHierarchy, PathArray
+from src.hierarchy import ANCESTOR_COLUMNS, flatten_paths
+
+
+class TreeIndex:
+    """
+    Nested-set index over the rows of a hierarchy DataFrame (or CompactHierarchy).
+
+    The lineage of a row is its `paths` followed by its own `_id` (prefixed by the
+    `database` of combined multi-database frames). Sorting rows by lineage gives
+    the pre-order (Euler tour) of the tree, in which the subtree of a row is the
+    contiguous interval [start, start + size). Queries are therefore slices and
+    O(1) interval tests instead of scans over the list column:
+    - subtree(row): every row below `row` (optionally of some types),
+    - ancestors(row): the rows on its path, from the top,
+    - is_ancestor(a, b), at_depth(depth).
+    Rows are addressed by their position in the indexed frame; rows_of(_id) maps ids.
+    """
+
+    def __init__(self, order, start, size, depth, level_start, own_level, ids: pd.Index, types):
+        self.order = order              # row positions in pre-order
+        self.start = start              # pre-order position of each row
+        self.size = size                # number of rows in each row's subtree, itself included
+        self.depth = depth              # len(paths) of each row
+        self._level_start = level_start  # pre-order position of the level-j ancestor group, per pre-order row
+        self._own_level = own_level      # lineage column holding each row's own id
+        self.ids = ids                  # `_id` of each row
+        self.types = types              # `type` of each row
+
+    def __len__(self):
+        return len(self.order)
+
+    @classmethod
+    def empty(cls) -> "TreeIndex":
+        rows = np.zeros(0, dtype=np.int64)
+        return cls(rows, rows, rows, rows, np.zeros((0, 1), dtype=np.int32), rows, pd.Index([], dtype=object), rows)
+
+    @classmethod
+    def from_hierarchy(cls, df) -> "TreeIndex":
+        frame = df.frame if isinstance(df, CompactHierarchy) else df
+        if not len(frame) or '_id' not in frame.columns:
+            # e.g. a database without assets (frames without columns)
+            return cls.empty()
+        if isinstance(df, CompactHierarchy):
+            frame, paths = df.frame, df.paths
+            id_codes = frame['_id'].cat.codes.to_numpy()
+        else:
+            frame = df
+            _, _, flat_ids = flatten_paths(frame['paths'].to_numpy())
+            ids = pd.Index(pd.unique(np.concatenate([frame['_id'].to_numpy(dtype=object), flat_ids])))
+            paths = PathArray.from_lists(frame['paths'].to_numpy(), ids)
+            id_codes = ids.get_indexer(frame['_id'].to_numpy(dtype=object))
+        n = len(frame)
+        lengths = np.diff(paths.offsets)
+
+        # --- Lineage matrix: [database,] path codes..., own code, then -1 padding ---
+        prefix = 1 if 'database' in frame.columns else 0
+        width = prefix + (int(lengths.max()) if n else 0) + 1
+        lineage = np.full((n, width), -1, dtype=np.int32)
+        if prefix:
+            lineage[:, 0] = pd.factorize(frame['database'].astype(object))[0]
+        rows = np.repeat(np.arange(n), lengths)
+        within = np.arange(len(paths.values)) - np.repeat(paths.offsets[:-1], lengths)
+        lineage[rows, prefix + within] = paths.values
+        own_level = prefix + lengths
+        lineage[np.arange(n), own_level] = id_codes
+
+        # Padding (-1) sorts first, so every row comes right before its descendants
+        order = np.lexsort(lineage[:, ::-1].T) if n else np.zeros(0, dtype=np.int64)
+        start = np.empty(n, dtype=np.int64)
+        start[order] = np.arange(n)
+        ordered = lineage[order]
+
+        # --- Rows sharing a lineage prefix are contiguous: group them level by level ---
+        size = np.ones(n, dtype=np.int64)
+        level_start = np.zeros((n, width), dtype=np.int32)
+        changed = np.zeros(n, dtype=bool)
+        ordered_level = own_level[order]
+        for level in range(width):
+            if n:
+                changed[0] = True
+                changed[1:] |= ordered[1:, level] != ordered[:-1, level]
+            group = np.cumsum(changed) - 1
+            group_start = np.flatnonzero(changed)
+            group_size = np.diff(np.append(group_start, n))
+            level_start[:, level] = group_start[group]
+            owners = ordered_level == level
+            size[order[owners]] = group_size[group[owners]]
+
+        types = frame['type'].to_numpy() if 'type' in frame.columns else np.zeros(n, dtype=np.int64)
+        return cls(order, start, size, lengths, level_start, own_level, pd.Index(frame['_id'].astype(object)), types)
+
+    # --- Queries ---
+
+    def rows_of(self, node_id) -> np.ndarray:
+        """Row positions with this `_id` (several in combined multi-database frames)."""
+        if node_id not in self.ids:
+            return np.zeros(0, dtype=np.int64)
+        location = self.ids.get_loc(node_id)
+        if isinstance(location, slice):
+            return np.arange(len(self.ids))[location]
+        if isinstance(location, np.ndarray):
+            return np.flatnonzero(location)
+        return np.array([location])
+
+    def subtree(self, row: int, include_self: bool = True, types=None) -> np.ndarray:
+        """Row positions of the subtree of `row`, in pre-order; optionally only of the given type codes."""
+        first = self.start[row] + (0 if include_self else 1)
+        rows = self.order[first:self.start[row] + self.size[row]]
+        if types is not None:
+            rows = rows[np.isin(self.types[rows], list(types))]
+        return rows
+
+    def ancestors(self, row: int) -> np.ndarray:
+        """Row positions of the ancestors of `row` present in the frame, from the top."""
+        position = self.start[row]
+        groups = self._level_start[position, :self._own_level[row]]
+        candidates = self.order[groups]
+        # The first row of an ancestor's group is that ancestor, unless it is missing from the frame
+        return candidates[self._own_level[candidates] == np.arange(len(groups))]
+
+    def is_ancestor(self, ancestor: int, row: int) -> bool:
+        return ancestor != row and self.start[ancestor] <= self.start[row] < self.start[ancestor] + self.size[ancestor]
+
+    def at_depth(self, depth: int) -> np.ndarray:
+        return np.flatnonzero(self.depth == depth)
+
+    def containers(self) -> np.ndarray:
+        """Rows of factories, assets and zones, in pre-order (for pickers)."""
+        rows = self.order
+        return rows[np.isin(self.types[rows], list(ANCESTOR_COLUMNS))]
+
+
+def select_rows(df, rows) -> pd.DataFrame:
+    """Plain DataFrame of the given row positions of a DataFrame or CompactHierarchy."""
+    if isinstance(df, CompactHierarchy):
+        return df.take(rows)
+    return df.iloc[rows]
@@ -0,0 +1,26 @@
+import pandas as pd
+from benchmarks.mock_isee import MockConfig, MockIseeServer
+from src import adaptive
+from src.api import Api
+
+
+def _fetch(base_url, **kwargs):
+    api = Api("user", "password", base_url=base_url)
+    api.login_step1_get_dbs("EU")
+    api.login_step2_select_db("db0")
+    api.TIMEOUT = (2, 60)
+    return api.get_hierarchy(workers=4, **kwargs)
+
+
+def test_adaptive_page_size_grows_past_default(monkeypatch):
+    monkeypatch.setattr(adaptive, "_settings", {})
+    with MockIseeServer(MockConfig(assets=6000, latency=0.01, seed=3)) as server:
+        reference, _ = _fetch(server.base_url)
+        sizes = []
+        for _ in range(3):
+            hierarchy, _ = _fetch(server.base_url, adaptive=True)
+            pd.testing.assert_frame_equal(hierarchy, reference)
+            sizes.append(adaptive.learned_settings("EU").page_size)
+
+    assert sizes[0] > Api.PAGE_SIZE
+    assert sizes[-1] == adaptive.MAX_PAGE_SIZE
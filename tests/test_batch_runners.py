@@ -0,0 +1,39 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+PAGE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "pages", "2_Batch_Diagnostic.py")
+
+
+def _runner_options(monkeypatch, **secrets):
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(PAGE)))
+    at = AppTest.from_file(PAGE, default_timeout=60)
+    at.secrets["password"] = "x"
+    for name, value in secrets.items():
+        at.secrets[name] = value
+    at.session_state["password_correct"] = True
+    at.run()
+    at.text_area[0].set_value("WGB25BE008698").run()
+    assert not at.exception
+    return [s for s in at.selectbox if s.label == "Runner:"][0], at
+
+
+@pytest.fixture(autouse=True)
+def _no_runner_env(monkeypatch):
+    monkeypatch.delenv("BATCH_ALLOW_LOCAL_SHELL", raising=False)
+    monkeypatch.delenv("BATCH_SSH_HOSTS", raising=False)
+
+
+def test_only_dry_run_by_default(monkeypatch):
+    runner, _ = _runner_options(monkeypatch)
+    assert runner.options == ["Dry run (nothing is executed)"]
+
+
+def test_ssh_is_limited_to_configured_hosts(monkeypatch):
+    monkeypatch.setenv("BATCH_SSH_HOSTS", "gw1.example, gw2.example")
+    runner, at = _runner_options(monkeypatch)
+    assert "SSH" in runner.options and "Local shell" not in runner.options
+    runner.set_value("SSH").run()
+    host = [s for s in at.selectbox if s.label == "Host"][0]
+    assert host.options == ["gw1.example", "gw2.example"]
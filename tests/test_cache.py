@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+import pandas as pd
+from src.cache import INCOMPLETE_GRACE, HierarchyCache
+from src.hierarchy import AssetBuffer
+
+
+def _frames(rows: int = 5000):
+    raw = pd.DataFrame({
+        "_id": [str(i) for i in range(rows)],
+        "name": ["asset"] * rows,
+        "path": [[]] * rows,
+        "t": [1] * rows,
+        "mac": [None] * rows,
+    })
+    return AssetBuffer.from_frame(raw), raw.drop(columns="path")
+
+
+def test_concurrent_stores_keep_every_entry(tmp_path):
+    cache = HierarchyCache(root=str(tmp_path))
+    buffer, frame = _frames()
+    errors = []
+
+    def store(database):
+        try:
+            cache.store("EU", database, buffer, frame, frame, total=len(frame), page_size=1000)
+        except Exception as e:
+            errors.append(e)
+
+    for _ in range(3):
+        threads = [threading.Thread(target=store, args=(f"db{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert all(cache.info("EU", f"db{i}") is not None for i in range(4))
+
+
+def test_evict_removes_abandoned_incomplete_entries_only(tmp_path):
+    cache = HierarchyCache(root=str(tmp_path))
+    recent = cache.entry_dir("EU", "recent")
+    abandoned = cache.entry_dir("EU", "abandoned")
+    for entry in (recent, abandoned):
+        os.makedirs(entry)
+        with open(os.path.join(entry, "assets.parquet.tmp"), "wb") as f:
+            f.write(b"partial")
+    old = time.time() - INCOMPLETE_GRACE - 60
+    os.utime(os.path.join(abandoned, "assets.parquet.tmp"), (old, old))
+    os.utime(abandoned, (old, old))
+
+    cache.evict()
+
+    assert os.path.isdir(recent)
+    assert not os.path.exists(abandoned)
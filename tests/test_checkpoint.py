@@ -0,0 +1,29 @@
+import os
+
+from src.checkpoint import FetchCheckpoint
+from src.hierarchy import AssetBuffer
+
+
+def _buffer():
+    buffer = AssetBuffer()
+    buffer.ids, buffer.names, buffer.paths, buffer.types, buffer.macs = ["a"], ["Asset"], [""], [2], [""]
+    return buffer
+
+
+def test_save_page_recreates_removed_directory(tmp_path):
+    checkpoint = FetchCheckpoint("EU_db0_1000", root=str(tmp_path))
+    checkpoint.begin(10)
+    # Another download on a different page grid pruned this checkpoint
+    FetchCheckpoint("EU_db0_4000", root=str(tmp_path)).begin(10)
+    assert not os.path.exists(checkpoint.directory)
+
+    assert checkpoint.save_page(1, _buffer())
+    assert checkpoint.load_page(1).ids == ["a"]
+
+
+def test_save_page_failure_is_not_raised(tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    checkpoint = FetchCheckpoint("EU_db0_1000", root=str(blocker))
+
+    assert checkpoint.save_page(1, _buffer()) is False
@@ -0,0 +1,16 @@
+from benchmarks.mock_isee import MockConfig, MockIseeServer
+from src.api import Api
+from src.client_pool import ClientPool
+
+
+def test_client_logs_in_again_when_pooled_login_expired():
+    with MockIseeServer(MockConfig(assets=10)) as server:
+        pool = ClientPool(base_url=server.base_url)
+        user_client, dbs = pool.login("EU", "user", "password")
+        # The server dropped the step-1 session before token_ttl
+        user_client.user_token = "expired"
+
+        client = pool.client("EU", "user", "password", dbs[0]["db"])
+
+        assert isinstance(client, Api)
+        assert pool.login("EU", "user", "password")[0] is not user_client
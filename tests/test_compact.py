@@ -0,0 +1,17 @@
+import pandas as pd
+from src.compact import compact_hierarchy, compact_listname, frame_memory
+from src.export import build_exports
+
+
+def test_empty_database_compacts_and_exports(tmp_path):
+    # get_hierarchy returns frames without columns for a database without assets
+    df_hierarchy, df_listname = compact_hierarchy(pd.DataFrame()), compact_listname(pd.DataFrame())
+
+    assert len(df_hierarchy) == 0
+    assert df_hierarchy.to_frame().empty
+    assert df_hierarchy.head().empty
+    assert frame_memory(df_hierarchy) >= 0
+
+    artifacts = build_exports({"hierarchy": df_hierarchy, "listname": df_listname}, "empty", root=str(tmp_path))
+    assert set(artifacts["hierarchy"]) == {"csv", "csv.gz", "parquet"}
+    assert pd.read_parquet(artifacts["hierarchy"]["parquet"]).empty
@@ -0,0 +1,21 @@
+import pandas as pd
+from benchmarks.mock_isee import MockConfig, MockIseeServer
+from src.api import Api
+from src.export import build_exports
+from src.multi_db import combine_hierarchies, fetch_databases
+
+
+def test_parquet_export_of_combined_compact_databases(tmp_path):
+    with MockIseeServer(MockConfig(assets=300, databases=("A", "B"))) as server:
+        api = Api("user", "password", base_url=server.base_url)
+        dbs = api.login_step1_get_dbs("EU")
+        fetches = fetch_databases(api, dbs, workers=2)
+    df_hierarchy, df_listname = combine_hierarchies(fetches, compact=True)
+
+    artifacts = build_exports({"hierarchy": df_hierarchy, "listname": df_listname}, "multi", root=str(tmp_path))
+
+    assert set(artifacts["hierarchy"]) == {"csv", "csv.gz", "parquet"}
+    exported = pd.read_parquet(artifacts["hierarchy"]["parquet"])
+    assert len(exported) == len(df_hierarchy)
+    assert set(exported["database"]) == {"A", "B"}
+    assert len(pd.read_parquet(artifacts["listname"]["parquet"])) == len(df_listname)
@@ -0,0 +1,26 @@
+import os
+
+from src.lookup_store import LookupStore
+
+
+def _write_csv(path, rows, mtime_ns):
+    with open(path, "w") as f:
+        f.write("serial_number,mac_address\n")
+        f.writelines(f"{serial},{mac}\n" for serial, mac in rows)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_sync_upserts_and_reload_replaces(tmp_path):
+    csv = str(tmp_path / "lookup.csv")
+    store = LookupStore(str(tmp_path / "lookup.db"))
+    _write_csv(csv, [("SN1", "AABBCCDDEE01"), ("SN2", "AABBCCDDEE02")], 1_000_000_000)
+    assert store.sync_csv(csv) == 2
+    assert store.sync_csv(csv) is None
+
+    # SN2 removed from the file: a sync keeps it, an explicit reload drops it
+    _write_csv(csv, [("SN1", "AABBCCDDEE01")], 2_000_000_000)
+    store.sync_csv(csv)
+    assert len(store) == 2
+    store.import_csv(csv, replace=True)
+    assert len(store) == 1
+    assert store.lookup(["SN1", "SN2"]).isna().tolist() == [False, True]
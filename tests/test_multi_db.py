@@ -0,0 +1,17 @@
+from benchmarks.mock_isee import MockConfig, MockIseeServer
+from src import adaptive
+from src.api import Api
+from src.multi_db import fetch_databases
+
+
+def test_fetch_databases_passes_adaptive_settings(monkeypatch):
+    monkeypatch.setattr(adaptive, "_settings", {})
+    with MockIseeServer(MockConfig(assets=3000, databases=("A", "B"))) as server:
+        api = Api("user", "password", base_url=server.base_url)
+        dbs = api.login_step1_get_dbs("EU")
+        fetches = fetch_databases(api, dbs, workers=2, adaptive=True, max_rate=50.0)
+
+    assert [fetch.status for fetch in fetches] == ["done", "done"]
+    assert all(len(fetch.df_hierarchy) for fetch in fetches)
+    # Only adaptive fetches settle learned settings for the server
+    assert "EU" in adaptive._settings
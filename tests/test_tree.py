@@ -0,0 +1,12 @@
+import pandas as pd
+from src.compact import compact_hierarchy
+from src.tree import TreeIndex
+
+
+def test_empty_hierarchy_gives_an_empty_index():
+    # get_hierarchy returns frames without columns for a database without assets
+    for frame in (pd.DataFrame(), compact_hierarchy(pd.DataFrame())):
+        index = TreeIndex.from_hierarchy(frame)
+        assert len(index) == 0
+        assert len(index.containers()) == 0
+        assert len(index.rows_of("missing")) == 0